@@ -0,0 +1,262 @@
+import json
+import os
+from datetime import datetime
+from typing import List, Dict, Optional, Union
+
+import pandas as pd
+
+from excel_exporter import ExcelExporter
+
+# 日志格式变化时递增，旧格式的日志不会被误用
+JOURNAL_VERSION = 3
+APPEND_TIME_COLUMN = '追加时间'
+
+
+def journal_path_for(excel_file: str) -> str:
+    """追加日志与工作簿放在同一文件夹"""
+    return excel_file + '.journal'
+
+
+def _encode(value):
+    """单元格值写入日志：日期记为 {"$date": ISO格式}，其余为JSON原生类型"""
+    if isinstance(value, datetime):
+        return {'$date': value.isoformat()}
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict) and '$date' in value:
+        return datetime.fromisoformat(value['$date'])
+    return value
+
+
+def _workbook_state(excel_file: str) -> Optional[List[int]]:
+    """工作簿的大小和修改时间，用于判断写入是否已完成"""
+    try:
+        stat_result = os.stat(excel_file)
+    except OSError:
+        return None
+    return [stat_result.st_size, stat_result.st_mtime_ns]
+
+
+class AppendJournal:
+    """追加日志：把要追加到现有Excel的行先记录在工作簿旁的日志文件中，之后一次性写入工作簿
+
+    每次追加只在日志末尾写一行JSON，不需要读取和保存整个工作簿；flush 时把全部待写入的行
+    一次加载、一次保存写入工作簿，每行保留记入日志时的追加时间。
+    日志第一行记录工作表、标题行、列名映射（保留标题单元格的原值，如数字列名）和记入日志时的最后一个数据行，
+    之后每行为一次追加，每个数据行按列名映射的顺序记为一个列表。
+    写入工作簿前会先在日志中记下写入标记，写入中途中断时可以据此判断是否已写入，避免重复追加。
+    """
+
+    def __init__(self, excel_file: str, sheet_name: Optional[str] = None, header_row: int = 0):
+        self.excel_file = excel_file
+        self.sheet_name = sheet_name
+        self.header_row = header_row  # 从0开始，与 existing_excel['header_row'] 一致
+        self.path = journal_path_for(excel_file)
+        self.header: Optional[Dict] = None
+        self.entries: List[Dict] = []
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # 写入中断留下的不完整的一行
+                continue
+        if not records or records[0].get('type') != 'header' or records[0].get('version') != JOURNAL_VERSION:
+            return
+        header, entries = records[0], records[1:]
+        if entries and entries[-1].get('type') == 'flush':
+            # 上次写入工作簿后未能删除日志：工作簿已变化且最后一个数据行已包含待写入的行，说明写入已完成
+            if (_workbook_state(self.excel_file) != entries[-1].get('workbook')
+                    and self._flush_applied(header, entries[:-1])):
+                self._remove()
+                return
+            entries = entries[:-1]
+            self.header = header
+            self.entries = [entry for entry in entries if entry.get('type') == 'rows']
+            self._rewrite()
+            return
+        self.header = header
+        self.entries = [entry for entry in entries if entry.get('type') == 'rows']
+
+    @property
+    def pending(self) -> int:
+        """待写入工作簿的行数"""
+        return sum(len(entry['rows']) for entry in self.entries)
+
+    def _write_lines(self, records: List[Dict], mode: str):
+        with open(self.path, mode, encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite(self):
+        """重写日志，用于去掉未完成的写入标记"""
+        self._write_lines([self.header] + self.entries, 'w')
+
+    def _remove(self):
+        self.header = None
+        self.entries = []
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _scan_workbook(self, sheet_name: Optional[str], header_row: int):
+        """读取工作簿标题行的列名映射（列名 -> 列号）和最后一个数据行的行号"""
+        from openpyxl import load_workbook
+        wb = load_workbook(self.excel_file, read_only=True)
+        try:
+            ws = wb[sheet_name] if sheet_name and sheet_name in wb.sheetnames else wb.active
+            header_row += 1
+            columns = {}
+            last_row = header_row
+            for row_idx, values in enumerate(ws.iter_rows(min_row=header_row, values_only=True), header_row):
+                if row_idx == header_row:
+                    # 重复的列名以最右侧一列为准，与追加时一致
+                    for col_idx, value in enumerate(values, 1):
+                        if value:
+                            columns[value] = col_idx
+                elif any(value is not None for value in values):
+                    last_row = row_idx
+        finally:
+            wb.close()
+        return columns, last_row
+
+    def _flush_applied(self, header: Dict, entries: List[Dict]) -> bool:
+        """写入中断后工作簿有变化时，按最后一个数据行判断待写入的行是否已写入"""
+        pending = sum(len(entry['rows']) for entry in entries if entry.get('type') == 'rows')
+        try:
+            _, last_row = self._scan_workbook(header['sheet_name'], header['header_row'])
+        except Exception:
+            # 无法读取工作簿时按已写入处理，避免重复追加
+            return True
+        return last_row >= header['last_row'] + pending
+
+    def _read_header(self) -> Dict:
+        """读取工作簿的标题行列名映射和最后一个数据行，建立日志时读取一次"""
+        try:
+            columns, last_row = self._scan_workbook(self.sheet_name, self.header_row)
+        except Exception as e:
+            raise Exception(f"读取Excel标题行错误: {str(e)}")
+        return {
+            'type': 'header',
+            'version': JOURNAL_VERSION,
+            'sheet_name': self.sheet_name,
+            'header_row': self.header_row,
+            # 列名保留单元格原值（与 pandas 读取的列名一致），记为 [列名, 列号]
+            'columns': [[_encode(value), col_idx] for value, col_idx in columns.items()],
+            'last_row': last_row,
+            'workbook': _workbook_state(self.excel_file)
+        }
+
+    def _columns(self) -> List:
+        """日志中每个数据行对应的列名，即标题行中除追加时间外的列"""
+        columns = [_decode(value) for value, _ in self.header['columns']]
+        return [column for column in columns if column != APPEND_TIME_COLUMN]
+
+    def append(self, data: Union[List[Dict], pd.DataFrame]) -> int:
+        """把行记入日志，只保留工作簿标题行中存在的列，返回本次记入的行数"""
+        if self.header is not None and (self.header['sheet_name'] != self.sheet_name
+                                        or self.header['header_row'] != self.header_row):
+            raise Exception("追加日志中有写入其他工作表或标题行的待写入数据，请先写入Excel")
+        if self.header is None:
+            self.header = self._read_header()
+            self._write_lines([self.header], 'w')
+
+        records = ExcelExporter._frame_records(data) if isinstance(data, pd.DataFrame) else data
+        columns = self._columns()
+        rows = []
+        for record in records:
+            rows.append([_encode(ExcelExporter._to_cell_value(record.get(column))) for column in columns])
+        if not rows:
+            return 0
+        entry = {'type': 'rows', 'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'rows': rows}
+        self._write_lines([entry], 'a')
+        self.entries.append(entry)
+        return len(rows)
+
+    def pending_rows(self) -> List[Dict]:
+        """待写入的行，每行带追加时间"""
+        columns = self._columns() if self.header is not None else []
+        rows = []
+        for entry in self.entries:
+            for values in entry['rows']:
+                row = {column: _decode(value) for column, value in zip(columns, values)}
+                row[APPEND_TIME_COLUMN] = entry['time']
+                rows.append(row)
+        return rows
+
+    def read_dataframe(self) -> pd.DataFrame:
+        """读取工作簿中的数据并接上待写入的行，得到与写入后相同的完整数据
+
+        读取指定的工作表和标题行；待写入的行属于其他工作表或标题行时不接上。
+        """
+        try:
+            df = pd.read_excel(self.excel_file, header=self.header_row,
+                               sheet_name=self.sheet_name if self.sheet_name else 0)
+        except Exception as e:
+            raise Exception(f"读取Excel错误: {str(e)}")
+        if self.header is None or (self.header['sheet_name'] != self.sheet_name
+                                   or self.header['header_row'] != self.header_row):
+            return df
+        pending = self.pending_rows()
+        if not pending:
+            return df
+        pending_df = pd.DataFrame(pending, dtype=object).reindex(columns=df.columns)
+        return pd.concat([df, pending_df], ignore_index=True)
+
+    def flush(self, exporter: Optional[ExcelExporter] = None) -> int:
+        """把全部待写入的行一次写入工作簿并删除日志，返回写入的行数"""
+        if not self.entries:
+            self._remove()
+            return 0
+        rows = self.pending_rows()
+        append_times = [row.pop(APPEND_TIME_COLUMN) for row in rows]
+        # 写入日志建立时选择的工作表和标题行
+        sheet_name, header_row = self.header['sheet_name'], self.header['header_row']
+        # 先记下写入前的工作簿状态，写入中途中断时据此判断是否已写入
+        self._write_lines([{'type': 'flush', 'workbook': _workbook_state(self.excel_file)}], 'a')
+        try:
+            (exporter or ExcelExporter()).export_to_excel(
+                pd.DataFrame(rows, dtype=object),
+                self.excel_file,
+                existing_excel={'file': self.excel_file, 'header_row': header_row,
+                                'columns': [_decode(value) for value, _ in self.header['columns']]},
+                append_mode=True,
+                sheet_name=sheet_name,
+                append_times=append_times
+            )
+        except Exception:
+            # 工作簿未写入，去掉写入标记，待写入的行保留在日志中
+            self._rewrite()
+            raise
+        self._remove()
+        return len(rows)
+
+
+def append_to_excel(data: Union[List[Dict], pd.DataFrame], existing_excel: Dict,
+                    exporter: Optional[ExcelExporter] = None) -> int:
+    """直接追加到现有Excel；追加日志中有待写入的行时，新行接在其后一起写入，保持追加顺序"""
+    journal = AppendJournal(existing_excel['file'], existing_excel.get('sheet_name'), existing_excel['header_row'])
+    if journal.pending:
+        journal.append(data)
+        return journal.flush(exporter)
+    (exporter or ExcelExporter()).export_to_excel(
+        data,
+        existing_excel['file'],
+        existing_excel=existing_excel,
+        append_mode=True,
+        sheet_name=existing_excel.get('sheet_name')
+    )
+    return len(data)
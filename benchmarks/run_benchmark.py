@@ -0,0 +1,223 @@
+"""提取性能基准测试
+
+在合成语料上分别计时 process_pdf 全流程、表格路径、文本块路径和 Excel 导出，
+输出吞吐量和峰值内存（tracemalloc）的JSON报告，便于比较不同版本。
+
+用法：python benchmarks/run_benchmark.py --files 60 --pages 1-6 -o bench.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import List, Dict, Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import pdfplumber
+from openpyxl import Workbook
+
+from excel_exporter import ExcelExporter
+from pdf_backends import count_pages
+from pdf_processor import PDFProcessor
+from synthetic_pdf import DEFAULT_KEY_FILE, generate_corpus, load_labels, parse_page_range
+from value_postprocess import postprocess_columns, postprocess_record, postprocess_records
+
+
+def _measure(func: Callable, repeat: int, trace_memory: bool) -> Dict:
+    """多次运行取最短用时；另行运行一次记录 tracemalloc 峰值，避免追踪开销影响计时"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    stats = {'seconds': round(min(timings), 4), 'runs': [round(t, 4) for t in timings]}
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            func()
+            stats['peak_memory_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        finally:
+            tracemalloc.stop()
+    return stats
+
+
+def _rate(count: int, seconds: float):
+    return round(count / seconds, 2) if seconds else None
+
+
+def _bench_process_pdf(processor: PDFProcessor, files: List[str], pages: int, args) -> Dict:
+    stats = _measure(lambda: [processor.process_pdf(f) for f in files], args.repeat, True)
+    stats['files_per_second'] = _rate(len(files), stats['seconds'])
+    stats['pages_per_second'] = _rate(pages, stats['seconds'])
+    return stats
+
+
+def _bench_page_paths(processor: PDFProcessor, files: List[str], args) -> Dict:
+    """逐页分别计时页面解析、表格路径和文本块路径"""
+    totals = {'parse': [], 'tables': [], 'text_blocks': []}
+    counts = {'pages': 0, 'tables': 0, 'table_results': 0, 'blocks': 0, 'text_results': 0}
+    for run in range(args.repeat):
+        parse = tables = text = 0.0
+        for file_path in files:
+            for context in processor.backend.iter_pages(file_path):
+                try:
+                    started = time.perf_counter()
+                    context.chars  # 解析页面内容
+                    parsed = time.perf_counter()
+                    page_tables = context.extract_tables()
+                    table_results = [r for table in page_tables for r in processor._process_table(table)]
+                    tabled = time.perf_counter()
+                    blocks = processor._extract_text_blocks(context)
+                    text_results = processor._process_text_blocks(blocks) if blocks else []
+                    finished = time.perf_counter()
+                finally:
+                    context.close()
+                parse += parsed - started
+                tables += tabled - parsed
+                text += finished - tabled
+                if run == 0:
+                    counts['pages'] += 1
+                    counts['tables'] += len(page_tables)
+                    counts['table_results'] += len(table_results)
+                    counts['blocks'] += len(blocks)
+                    counts['text_results'] += len(text_results)
+        totals['parse'].append(parse)
+        totals['tables'].append(tables)
+        totals['text_blocks'].append(text)
+
+    report = {}
+    for stage, timings in totals.items():
+        seconds = min(timings)
+        report[stage] = {
+            'seconds': round(seconds, 4),
+            'runs': [round(t, 4) for t in timings],
+            'pages_per_second': _rate(counts['pages'], seconds)
+        }
+    report['tables'].update(tables=counts['tables'], results=counts['table_results'])
+    report['text_blocks'].update(blocks=counts['blocks'], results=counts['text_results'])
+    return report
+
+
+def _bench_export(records: List[Dict], labels: List[str], work_dir: str, args) -> Dict:
+    exporter = ExcelExporter()
+    new_file = os.path.join(work_dir, 'export_new.xlsx')
+    new_stats = _measure(
+        lambda: exporter.export_to_excel(postprocess_records(records), new_file), args.repeat, True)
+    new_stats['rows'] = len(records)
+    new_stats['rows_per_second'] = _rate(len(records), new_stats['seconds'])
+
+    # 流式导出：逐条处理并写入只写工作簿，不构建数据框
+    stream_file = os.path.join(work_dir, 'export_stream.xlsx')
+    stream_stats = _measure(
+        lambda: exporter.stream_to_excel(map(postprocess_record, records), stream_file), args.repeat, True)
+    stream_stats['rows'] = len(records)
+    stream_stats['rows_per_second'] = _rate(len(records), stream_stats['seconds'])
+
+    # 追加模式：在已有若干数据行的台账后追加每个项目一行
+    columns = ['序号'] + labels
+    rows = [{label: f"值{i}" for label in labels} for i in range(args.append_rows)]
+    ledger = os.path.join(work_dir, 'ledger.xlsx')
+
+    def build_ledger():
+        wb = Workbook()
+        ws = wb.active
+        ws.append(columns)
+        for i in range(args.ledger_rows):
+            ws.append([i + 1] + [f"历史{i}"] * len(labels))
+        wb.save(ledger)
+
+    def append():
+        build_ledger()
+        exporter.export_to_excel(
+            postprocess_columns(pd.DataFrame(rows)), ledger,
+            existing_excel={'file': ledger, 'header_row': 0, 'columns': columns},
+            append_mode=True)
+
+    build_stats = _measure(build_ledger, args.repeat, False)
+    append_stats = _measure(append, args.repeat, True)
+    # 扣除每次重建台账的时间；runs 中仍包含重建时间
+    append_stats['seconds'] = round(max(append_stats['seconds'] - build_stats['seconds'], 0), 4)
+    append_stats['ledger_rows'] = args.ledger_rows
+    append_stats['appended_rows'] = args.append_rows
+    append_stats['rows_per_second'] = _rate(args.append_rows, append_stats['seconds'])
+    return {'new_workbook': new_stats, 'streaming': stream_stats, 'append': append_stats}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="PDF提取性能基准测试，输出JSON报告")
+    parser.add_argument('--corpus', help="已有语料目录；不指定时在临时目录生成合成语料")
+    parser.add_argument('--files', type=int, default=30, help="合成语料的文件数量")
+    parser.add_argument('--pages', type=parse_page_range, default=(1, 6), help="每个文件的页数或范围")
+    parser.add_argument('--seed', type=int, default=1, help="合成语料的随机种子")
+    parser.add_argument('--key-file', default=DEFAULT_KEY_FILE, help="键名文件")
+    parser.add_argument('--read-order', choices=['left_to_right', 'top_to_bottom'], default='left_to_right')
+    parser.add_argument('--repeat', type=int, default=3, help="每项计时的重复次数，取最短用时")
+    parser.add_argument('--ledger-rows', type=int, default=2000, help="追加导出测试中台账已有的数据行数")
+    parser.add_argument('--append-rows', type=int, default=50, help="追加导出测试中新增的行数")
+    parser.add_argument('-o', '--output', help="JSON报告文件，默认输出到标准输出")
+    args = parser.parse_args(argv)
+
+    # pdfminer 对合成字体的告警与性能无关
+    logging.disable(logging.WARNING)
+
+    work_dir = tempfile.mkdtemp(prefix='pdf_bench_')
+    try:
+        if args.corpus:
+            files = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(args.corpus)
+                for name in names if name.lower().endswith('.pdf'))
+        else:
+            files = generate_corpus(os.path.join(work_dir, 'corpus'), args.files,
+                                    args.pages[0], args.pages[1], seed=args.seed, key_file=args.key_file)
+        labels = load_labels(args.key_file)
+        pages = sum(count_pages(f) for f in files)
+
+        # 不使用缓存和版面模板，测量的是提取本身
+        processor = PDFProcessor(args.read_order, allow_empty=True, custom_keys=labels)
+        records = []
+        for file_path in files:
+            for item in processor.process_pdf(file_path):
+                records.append(dict(item, filename=os.path.basename(file_path),
+                                    folder=os.path.basename(os.path.dirname(file_path))))
+
+        report = {
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'pdfplumber': pdfplumber.__version__,
+            },
+            'corpus': {
+                'source': args.corpus or 'synthetic',
+                'seed': None if args.corpus else args.seed,
+                'files': len(files),
+                'pages': pages,
+                'bytes': sum(os.path.getsize(f) for f in files),
+            },
+            'read_order': args.read_order,
+            'repeat': args.repeat,
+            'process_pdf': _bench_process_pdf(processor, files, pages, args),
+            'stages': _bench_page_paths(processor, files, args),
+            'export': _bench_export(records, labels, work_dir, args),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    encoded = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(encoded + '\n')
+    else:
+        print(encoded)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""合成采购公告PDF生成器
+
+生成包含横向/纵向带边框表格、"键：值"文本块和填充页的PDF，键名取自键名文件。
+不依赖第三方库：直接写出PDF对象，中文使用阅读器内置的 STSong-Light 字体。
+
+用法：python benchmarks/synthetic_pdf.py 输出目录 --files 60 --pages 1-6
+"""
+import argparse
+import os
+import random
+import sys
+from typing import List, Tuple
+
+# 页面类型：h 横向表格，v 纵向表格，c 冒号文本块，f 填充页
+PAGE_KINDS = 'hvcf'
+
+DEFAULT_KEY_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'key_names_example.txt')
+
+_UNITS = ['深圳市财政局', '广州市教育局', '某区卫生健康局', '市政务服务数据管理局']
+_PROJECTS = ['办公设备采购项目', '校园安防系统建设', '信息化运维服务', '医疗设备采购（二期）']
+_COMPANIES = ['某某科技有限公司', '甲乙信息技术有限公司', '丙丁建设工程有限公司']
+_METHODS = ['公开招标', '竞争性谈判', '竞争性磋商', '单一来源']
+_CATEGORIES = ['货物类', '服务类', '工程类']
+_FILLER = '本公告所涉及的法律条款及供应商须知内容仅供参考'
+
+
+def load_labels(key_file: str) -> List[str]:
+    with open(key_file, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def fake_value(label: str, rnd: random.Random) -> str:
+    """按键名类型生成看起来真实的值"""
+    if any(word in label for word in ['金额', '预算', '控制价', '报价']):
+        amount = rnd.randint(10000, 99999999) / 100
+        style = rnd.randint(0, 2)
+        if style == 0:
+            return f"{amount:,.2f}"
+        if style == 1:
+            return f"{amount:.2f}"
+        # 以空格分隔千位
+        return f"{amount:,.2f}".replace(',', ' ')
+    if '时间' in label:
+        year, month, day = rnd.randint(2020, 2025), rnd.randint(1, 12), rnd.randint(1, 28)
+        style = rnd.randint(0, 2)
+        if style == 0:
+            return f"{year}年{month}月{day}日 {rnd.randint(8, 17)}:30"
+        if style == 1:
+            return f"{year}-{month:02d}-{day:02d} 09:00:00"
+        return f"{year}/{month:02d}/{day:02d}"
+    if '方式' in label:
+        return rnd.choice(_METHODS)
+    if '类别' in label:
+        return rnd.choice(_CATEGORIES)
+    if '名称' in label:
+        return rnd.choice(_PROJECTS)
+    if '中标' in label:
+        return rnd.choice(_COMPANIES)
+    return rnd.choice(_UNITS)
+
+
+def _hex(text: str) -> str:
+    return "<" + text.encode("utf-16-be").hex().upper() + ">"
+
+
+def _text(x: float, y: float, text: str, size: int = 10) -> str:
+    return f"BT /F1 {size} Tf {x:.2f} {y:.2f} Td {_hex(text)} Tj ET\n"
+
+
+def _rect(x: float, y: float, w: float, h: float) -> str:
+    return f"{x:.2f} {y:.2f} {w:.2f} {h:.2f} re S\n"
+
+
+def _horizontal_table(rows: List[Tuple[str, str]], top: float = 800) -> str:
+    """每行一个"键名 | 值"的两列表格"""
+    out = ""
+    x0, key_width, value_width, row_height = 50, 170, 330, 22
+    for i, (key, value) in enumerate(rows):
+        y = top - (i + 1) * row_height
+        out += _rect(x0, y, key_width, row_height) + _rect(x0 + key_width, y, value_width, row_height)
+        out += _text(x0 + 3, y + 6, key) + _text(x0 + key_width + 3, y + 6, value)
+    return out
+
+
+def _vertical_table(rows: List[Tuple[str, str]], top: float = 800) -> str:
+    """首行为键名、次行为值的多列表格"""
+    out = ""
+    x0, row_height = 50, 30
+    cell_width = 490 / len(rows)
+    for i, (key, value) in enumerate(rows):
+        x = x0 + i * cell_width
+        out += _rect(x, top - row_height, cell_width, row_height)
+        out += _rect(x, top - 2 * row_height, cell_width, row_height)
+        out += _text(x + 2, top - row_height + 8, key, 7) + _text(x + 2, top - 2 * row_height + 8, value, 7)
+    return out
+
+
+def page_content(kind: str, labels: List[str], rnd: random.Random) -> str:
+    rows = [(label, fake_value(label, rnd)) for label in rnd.sample(labels, min(5, len(labels)))]
+    if kind == 'h':
+        return _horizontal_table(rows)
+    if kind == 'v':
+        return _vertical_table(rows[:4])
+    if kind == 'c':
+        return "".join(_text(50, 780 - i * 20, f"{key}：{value}") for i, (key, value) in enumerate(rows))
+    return "".join(_text(50, 780 - i * 20, f"{_FILLER}{i}") for i in range(30))
+
+
+def write_pdf(path: str, kinds: str, labels: List[str], seed: int = 0):
+    """按页面类型序列写出一个PDF文件"""
+    rnd = random.Random(seed)
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type0 /BaseFont /STSong-Light /Encoding /UniGB-UTF16-H "
+               b"/DescendantFonts [%d 0 R] >>" % (len(objects) + 2))
+    add(b"<< /Type /Font /Subtype /CIDFontType0 /BaseFont /STSong-Light "
+        b"/CIDSystemInfo << /Registry (Adobe) /Ordering (GB1) /Supplement 4 >> /DW 1000 >>")
+    pages_id = add(b"")
+    page_ids = []
+    for kind in kinds:
+        content = page_content(kind, labels, rnd).encode()
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font, content_id)))
+    objects[pages_id - 1] = (b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % i for i in page_ids)
+                             + b"] /Count %d >>" % len(page_ids))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def generate_corpus(output_dir: str, files: int, min_pages: int = 1, max_pages: int = 6,
+                    projects: int = 3, seed: int = 1, key_file: str = DEFAULT_KEY_FILE) -> List[str]:
+    """生成按项目文件夹组织的语料，返回生成的文件路径列表"""
+    labels = load_labels(key_file)
+    rnd = random.Random(seed)
+    paths = []
+    for n in range(files):
+        folder = os.path.join(output_dir, f"项目{n % projects + 1}")
+        os.makedirs(folder, exist_ok=True)
+        kinds = "".join(rnd.choice(PAGE_KINDS) for _ in range(rnd.randint(min_pages, max_pages)))
+        path = os.path.join(folder, f"结果公告{n}.pdf")
+        write_pdf(path, kinds, labels, seed=seed * 100003 + n)
+        paths.append(path)
+    return paths
+
+
+def parse_page_range(text: str) -> Tuple[int, int]:
+    """解析 "3" 或 "1-6" 形式的页数范围"""
+    low, _, high = text.partition('-')
+    low = int(low)
+    high = int(high) if high else low
+    if low < 1 or high < low:
+        raise argparse.ArgumentTypeError(f"无效的页数范围: {text}")
+    return low, high
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="生成合成采购公告PDF语料")
+    parser.add_argument('output_dir', help="输出目录")
+    parser.add_argument('--files', type=int, default=60, help="文件数量")
+    parser.add_argument('--pages', type=parse_page_range, default=(1, 6), help="每个文件的页数或范围，如 1-6")
+    parser.add_argument('--projects', type=int, default=3, help="项目文件夹数量")
+    parser.add_argument('--seed', type=int, default=1, help="随机种子，相同参数生成相同语料")
+    parser.add_argument('--key-file', default=DEFAULT_KEY_FILE, help="提供键名的键名文件")
+    args = parser.parse_args(argv)
+    paths = generate_corpus(args.output_dir, args.files, args.pages[0], args.pages[1],
+                            args.projects, args.seed, args.key_file)
+    print(f"已生成 {len(paths)} 个文件: {args.output_dir}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import List, Dict, Optional, Tuple
+
+from config_manager import ConfigManager, user_state_dir
+from excel_exporter import ExcelExporter
+from file_scanner import FolderManifest, manifest_path_for, parse_keywords, scan_pdf_files
+from folder_watcher import FolderWatcher
+from pdf_backends import BACKENDS, count_pages
+from pdf_processor import PDFProcessor
+from project_grouping import project_values
+
+
+def _add_state_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--config', metavar='SETTINGS',
+                        help="以界面的设置文件（如 settings.json）中的设置作为默认值，不指定时不读取界面的设置")
+    parser.add_argument('--state-dir',
+                        help="结果缓存、版面模板和扫描清单的保存位置，默认为用户缓存目录")
+
+
+def _parse_args(argv: Optional[List[str]], config: Dict) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="无界面批量提取PDF信息，每处理完一个文件输出一行NDJSON记录")
+    parser.add_argument('paths', nargs='+', help="要处理的文件夹或PDF文件")
+    _add_state_arguments(parser)
+    parser.add_argument('-k', '--key-file', default=config.get('key_file') or None,
+                        help="键名文件，每行一个键名（指定 --config 时默认使用其中的键名文件）")
+    parser.add_argument('-o', '--output', help="NDJSON输出文件，默认输出到标准输出")
+    parser.add_argument('--read-order', choices=['left_to_right', 'top_to_bottom'],
+                        default=config.get('read_order', 'left_to_right'), help="表格阅读顺序")
+    parser.add_argument('--project-mode', choices=['same', 'separate'],
+                        default=config.get('project_mode', 'same'),
+                        help="same：所有文件夹作为同一项目；separate：每个文件夹作为不同项目")
+    parser.add_argument('--filter', default=config.get('filter_keywords', ''),
+                        help="文件名过滤关键词，逗号分隔，传入空字符串表示不过滤")
+    parser.add_argument('--no-subfolders', action='store_true', help="不处理子文件夹")
+    parser.add_argument('--allow-empty', action=argparse.BooleanOptionalAction,
+                        default=config.get('allow_empty', False),
+                        help="保留未找到值的键名，--no-allow-empty 关闭（默认关闭）")
+    parser.add_argument('--workers', type=int, default=config.get('max_workers', 0),
+                        help="并行处理的进程数，0 表示按CPU核数自动选择")
+    parser.add_argument('--timeout', type=float, default=config.get('file_timeout', 300),
+                        help="单个文件的处理时限（秒），0 表示不限制")
+    parser.add_argument('--backend', choices=list(BACKENDS), default=config.get('pdf_backend', 'pdfplumber'),
+                        help="PDF解析后端：pdfplumber 支持表格，pdfminer 只提取文本块、速度更快")
+    parser.add_argument('--no-cache', action='store_true', help="不使用提取结果缓存")
+    parser.add_argument('--watch', metavar='EXCEL',
+                        help="持续监视给出的文件夹，新增或修改的PDF分批追加到此现有Excel")
+    parser.add_argument('--sheet', help="监视模式追加到的工作表，默认第一个工作表")
+    parser.add_argument('--header-row', type=int, default=1, help="监视模式下Excel的标题行号（从1开始）")
+    parser.add_argument('--poll-interval', type=float, default=config.get('watch_poll_seconds', 30),
+                        help="监视模式检查文件夹变化的间隔（秒）")
+    parser.add_argument('--batch-interval', type=float, default=config.get('watch_batch_seconds', 300),
+                        help="监视模式追加到Excel的批次间隔（秒）")
+    parser.add_argument('--verify-every', type=int, default=10,
+                        help="监视模式每隔多少次轮询逐个检查全部文件，以发现就地覆盖的文件，0 表示不检查")
+    parser.add_argument('--ingest-existing', action='store_true',
+                        help="首次监视时把文件夹中已有的PDF也追加到Excel")
+    parser.add_argument('--stats', action='store_true', default=config.get('collect_stats', False),
+                        help="统计各处理阶段的用时，输出在汇总记录中")
+    return parser.parse_args(argv)
+
+
+def _collect_files(paths: List[str], keywords: List[str], recursive: bool,
+                   config_manager: ConfigManager, config: Dict) -> Tuple[List[str], Dict[str, int]]:
+    """展开命令行给出的文件夹和文件，保持给出的顺序并去除重复
+
+    启用扫描清单时同时返回清单中记录的页数（文件路径 -> 页数）。
+    """
+    files = []
+    pages = {}
+    seen = set()
+    for path in paths:
+        if os.path.isdir(path):
+            manifest_path = config_manager.scan_manifest_path(config, path)
+            if manifest_path:
+                manifest = FolderManifest(path, manifest_path)
+                found = manifest.scan(keywords, recursive, with_pages=True)['files']
+                pages.update((file, manifest.pages(file)) for file in found)
+            else:
+                found = scan_pdf_files(path, keywords, recursive)
+        elif os.path.isfile(path):
+            found = [path]
+        else:
+            raise Exception(f"路径不存在: {path}")
+        for file in found:
+            file = os.path.abspath(file)
+            if file not in seen:
+                seen.add(file)
+                files.append(file)
+    return files, pages
+
+
+def _write_record(stream, record: Dict):
+    stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+    stream.flush()
+
+
+def _open_output(args):
+    if args.output:
+        return open(args.output, 'w', encoding='utf-8')
+    stream = sys.stdout
+    if hasattr(stream, 'reconfigure'):
+        stream.reconfigure(encoding='utf-8')
+    return stream
+
+
+def _watch(args, config_manager: ConfigManager, config: Dict, processor: PDFProcessor) -> int:
+    """监视模式：持续把新增或修改的PDF分批追加到现有Excel，每批输出一行NDJSON记录"""
+    if len(args.paths) != 1 or not os.path.isdir(args.paths[0]):
+        print("监视模式需要且只能给出一个文件夹", file=sys.stderr)
+        return 2
+    if not os.path.exists(args.watch) or args.header_row < 1:
+        print("请通过 --watch 指定有效的现有Excel文件，标题行号从1开始", file=sys.stderr)
+        return 2
+    try:
+        columns = ExcelExporter().get_excel_columns(args.watch, args.header_row - 1, args.sheet)
+    except Exception as e:
+        print(str(e), file=sys.stderr)
+        return 2
+
+    root = args.paths[0]
+    # 与界面选择文件夹使用的清单分开，避免界面扫描把尚未追加的文件记为已处理
+    manifest_path = manifest_path_for(root, os.path.join(config_manager.state_dir, 'watch_manifests'))
+    watcher = FolderWatcher(
+        root, processor,
+        existing_excel={'file': args.watch, 'header_row': args.header_row - 1,
+                        'columns': columns, 'sheet_name': args.sheet},
+        manifest_path=manifest_path,
+        project_mode=args.project_mode,
+        keywords=parse_keywords(args.filter),
+        recursive=not args.no_subfolders,
+        poll_interval=args.poll_interval,
+        batch_interval=args.batch_interval,
+        workers=args.workers,
+        timeout=args.timeout,
+        memory_limit_mb=config.get('worker_memory_mb', 0),
+        verify_every=args.verify_every
+    )
+
+    stream = _open_output(args)
+
+    def on_batch(batch):
+        _write_record(stream, {
+            'type': 'batch',
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'files': batch['files'],
+            'rows': batch['rows'],
+            'failed': [failure['file'] for failure in batch['failures']],
+            'skipped_folders': batch['skipped_folders'],
+            'seconds': round(batch['seconds'], 3)
+        })
+        print(f"已追加 {batch['rows']} 行（{len(batch['files'])} 个文件）到 {os.path.basename(args.watch)}",
+              file=sys.stderr)
+
+    def on_error(error):
+        _write_record(stream, {'type': 'error', 'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'error': str(error)})
+        print(f"追加到Excel出错，将在下一批次重试: {str(error)}", file=sys.stderr)
+
+    try:
+        queued = watcher.start(args.ingest_existing)
+        print(f"开始监视 {root}（{queued} 个文件待处理），按 Ctrl+C 停止", file=sys.stderr)
+        watcher.run(on_batch=on_batch, on_error=on_error)
+    except KeyboardInterrupt:
+        # 尚未追加的文件未记入清单，下次启动监视时会重新处理
+        print("已停止监视", file=sys.stderr)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    return 0
+
+
+def run(argv: Optional[List[str]] = None) -> int:
+    # 默认值不取自界面的 settings.json，同一命令在不同机器上得到相同的结果
+    state_parser = argparse.ArgumentParser(add_help=False)
+    _add_state_arguments(state_parser)
+    state_args, _ = state_parser.parse_known_args(argv)
+    config = {}
+    if state_args.config:
+        if not os.path.isfile(state_args.config):
+            print(f"设置文件不存在: {state_args.config}", file=sys.stderr)
+            return 2
+        config = ConfigManager(os.path.abspath(state_args.config)).load_config()
+    # 缓存等状态文件保存在用户缓存目录，不写入程序或PDF所在的文件夹
+    config_manager = ConfigManager(state_dir=os.path.abspath(state_args.state_dir or user_state_dir()))
+    args = _parse_args(argv, config)
+
+    if not args.key_file or not os.path.exists(args.key_file):
+        print("请通过 --key-file 指定有效的键名文件", file=sys.stderr)
+        return 2
+    with open(args.key_file, 'r', encoding='utf-8') as f:
+        key_names = [line.strip() for line in f if line.strip()]
+
+    options = config_manager.processor_options(config)
+    if args.no_cache:
+        options['cache_path'] = None
+    options['collect_stats'] = args.stats
+    options['backend'] = args.backend
+    processor = PDFProcessor(
+        read_order=args.read_order,
+        allow_empty=args.allow_empty,
+        custom_keys=key_names,
+        **options
+    )
+    if args.watch:
+        return _watch(args, config_manager, config, processor)
+
+    try:
+        files, manifest_pages = _collect_files(args.paths, parse_keywords(args.filter), not args.no_subfolders,
+                                               config_manager, config)
+    except Exception as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    if not files:
+        print("未找到符合条件的PDF文件", file=sys.stderr)
+        return 0
+
+    stream = _open_output(args)
+
+    total_pages = 0
+    processed_count = 0
+    started = time.monotonic()
+
+    def on_progress(file_path, result):
+        # 每个文件完成后立即输出，不等待整个批次结束
+        nonlocal total_pages, processed_count
+        processed_count += 1
+        pages = manifest_pages.get(file_path)
+        if pages is None:
+            pages = count_pages(file_path)
+        total_pages += pages
+        record = {
+            'type': 'file',
+            'file': file_path,
+            'folder': os.path.basename(os.path.dirname(file_path)),
+            'pages': pages
+        }
+        if isinstance(result, Exception):
+            record['status'] = 'error'
+            record['reason'] = getattr(result, 'reason', 'error')
+            record['error'] = str(result)
+        else:
+            record['status'] = 'ok'
+            record['results'] = [{'key': item['key'], 'value': item['value']} for item in result]
+            if file_path in processor.degraded_files:
+                # 超出内存上限后剩余页面未做表格识别，结果可能不完整
+                record['degraded'] = True
+        _write_record(stream, record)
+        print(f"已处理: {os.path.basename(file_path)} ({processed_count}/{len(files)})", file=sys.stderr)
+
+    try:
+        results = processor.process_many(
+            files,
+            workers=args.workers,
+            progress_callback=on_progress,
+            timeout=args.timeout,
+            memory_limit_mb=config.get('worker_memory_mb', 0)
+        )
+        elapsed = time.monotonic() - started
+
+        # 与界面的"新增表格信息"相同的项目汇总规则
+        projects, skipped_folders = project_values(files, dict(zip(files, results)), args.project_mode)
+        for project in projects:
+            _write_record(stream, {
+                'type': 'project',
+                'folders': project['folders'],
+                'values': {key: item['value'] for key, item in project['values'].items()}
+            })
+
+        summary = {
+            'type': 'summary',
+            'files': len(files),
+            'failed': len(processor.failures),
+            'degraded': list(processor.degraded_files),
+            'pages': total_pages,
+            'seconds': round(elapsed, 3),
+            'files_per_second': round(len(files) / elapsed, 3) if elapsed else None,
+            'pages_per_second': round(total_pages / elapsed, 3) if elapsed else None,
+            'skipped_folders': skipped_folders
+        }
+        if processor.stats.enabled:
+            summary['stages'] = processor.stats.totals()
+            # 预筛选或模板跳过的页数
+            summary['skipped_pages'] = summary['stages']['counts']['skipped_pages']
+        _write_record(stream, summary)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+    print(f"共处理 {summary['files']} 个文件（失败 {summary['failed']} 个，降级 {len(summary['degraded'])} 个），{total_pages} 页，"
+          f"用时 {elapsed:.1f} 秒，{summary['files_per_second']} 文件/秒，{summary['pages_per_second']} 页/秒",
+          file=sys.stderr)
+    if processor.stats.enabled:
+        print(processor.stats.summary(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    # 打包为可执行文件时，多进程处理需要此调用
+    multiprocessing.freeze_support()
+    sys.exit(run())
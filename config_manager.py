@@ -1,11 +1,28 @@
 import json
 import os
+import sys
+
+from file_scanner import manifest_path_for
+
+
+def user_state_dir() -> str:
+    """用户缓存目录下的程序文件夹，命令行默认在此保存结果缓存、版面模板和扫描清单"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.join(os.path.expanduser('~'), 'Library', 'Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'pdf_extractor')
+
 
 class ConfigManager:
-    def __init__(self, config_file='settings.json'):
+    def __init__(self, config_file='settings.json', state_dir=None):
         self.config_file = config_file
         self.config_dir = os.path.dirname(os.path.abspath(__file__))
         self.config_path = os.path.join(self.config_dir, self.config_file)
+        # 结果缓存、版面模板和扫描清单的保存位置，默认与配置文件相同
+        self.state_dir = state_dir or self.config_dir
         
         self.default_config = {
             'read_order': 'left_to_right',
@@ -16,7 +33,25 @@ class ConfigManager:
             'last_save_folder': '',  # 新增：上次保存Excel的位置
             'window_position': None,  # 新增：窗口位置
             'window_size': None,      # 新增：窗口大小
-            'project_mode': 'same'    # 新增：默认项目处理方式为所有文件夹作为同一项目
+            'project_mode': 'same',   # 新增：默认项目处理方式为所有文件夹作为同一项目
+            'max_workers': 0,         # 并行处理的进程数，0 表示按CPU核数自动选择
+            'use_cache': True,        # 是否缓存提取结果，未变化的文件不再重新解析
+            'cache_mode': 'use',      # 缓存模式：use / refresh（强制重新提取）/ bypass（不使用缓存）
+            'cache_max_mb': 512,      # 缓存文件的容量上限（MB）
+            'stop_when_complete': False,  # 所有键名都已找到值后不再解析后续页面
+            'max_pages': 0,           # 每个文档最多解析的页数，0 表示不限制
+            'page_prefilter': False,  # 跳过不含任何完整键名的页面，只含部分键名的表格标签会被漏掉，默认关闭
+            'memory_limit_mb': 0,     # 单个处理进程的内存上限（MB），0 表示不限制
+            'memory_policy': 'downgrade',  # 超出内存上限时：downgrade 跳过表格识别 / abandon 放弃该文件
+            'pdf_backend': 'pdfplumber',  # PDF解析后端：pdfplumber（支持表格）/ pdfminer（轻量，仅识别文本）
+            'file_timeout': 300,      # 单个文件的处理时限（秒），超时的处理进程会被终止，0 表示不限制
+            'worker_memory_mb': 0,    # 处理进程的内存硬上限（MB），超出时终止该进程，0 表示不限制
+            'use_layout_templates': False,  # 记录常见版式的键值区域，同版式文档只解析记录的页面和区域；未解析的页面中的值可能被漏掉，默认关闭
+            'collect_stats': False,   # 统计各处理阶段的用时，处理完成后在状态栏显示
+            'use_scan_manifest': True,  # 记录选择过的文件夹的扫描清单，再次选择时只重新读取有变化的子文件夹
+            'watch_poll_seconds': 30,   # 监视模式检查文件夹变化的间隔（秒）
+            'watch_batch_seconds': 300,  # 监视模式把新文件追加到Excel的批次间隔（秒）
+            'use_append_journal': False  # 新增表格信息先记入工作簿旁的追加日志，点击【写入Excel】时一次性保存
         }
 
     def load_config(self):
@@ -59,6 +94,34 @@ class ConfigManager:
             print(f"保存配置失败: {str(e)}")
             return False
 
+    def processor_options(self, config) -> dict:
+        """由配置生成 PDFProcessor 的处理选项（阅读顺序、键名等由调用方提供）"""
+        cache_path = None
+        if config.get('use_cache', True):
+            cache_path = os.path.join(self.state_dir, 'extract_cache.sqlite')
+        template_path = None
+        if config.get('use_layout_templates', False):
+            template_path = os.path.join(self.state_dir, 'layout_templates.sqlite')
+        return {
+            'cache_path': cache_path,
+            'cache_mode': config.get('cache_mode', 'use'),
+            'cache_max_mb': config.get('cache_max_mb', 512),
+            'stop_when_complete': config.get('stop_when_complete', False),
+            'max_pages': config.get('max_pages', 0),
+            'page_prefilter': config.get('page_prefilter', False),
+            'memory_limit_mb': config.get('memory_limit_mb', 0),
+            'memory_policy': config.get('memory_policy', 'downgrade'),
+            'backend': config.get('pdf_backend', 'pdfplumber'),
+            'template_path': template_path,
+            'collect_stats': config.get('collect_stats', False)
+        }
+
+    def scan_manifest_path(self, config, folder: str):
+        """文件夹扫描清单的保存路径，未启用扫描清单时返回None"""
+        if not config.get('use_scan_manifest', True):
+            return None
+        return manifest_path_for(folder, os.path.join(self.state_dir, 'scan_manifests'))
+
     def get_file_dialog_kwargs(self, dialog_type='file'):
         """获取文件对话框的初始参数"""
         config = self.load_config()
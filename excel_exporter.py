@@ -1,167 +1,266 @@
 import pandas as pd
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union, Iterable, Iterator
+import itertools
 import os
+import shutil
+import uuid
 from datetime import datetime
 
+# 日期单元格的显示格式
+DATE_FORMAT = 'yyyy-mm-dd'
+
+
+def _create_temp_file(folder: str, name: str) -> str:
+    """在文件夹中新建一个不与现有文件重名的临时文件
+
+    以 0o666 创建，由系统按 umask 决定实际权限，与直接创建目标文件时相同；
+    不读取或修改进程的 umask，可以在后台线程中安全调用。
+    """
+    while True:
+        temp_path = os.path.join(folder, f".{name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        except FileExistsError:
+            continue
+        os.close(fd)
+        return temp_path
+
+
+def save_workbook(workbook, output_file: str):
+    """先保存到同一文件夹下的临时文件并写入磁盘，再整体替换目标文件
+
+    保存中途出错或中断时目标文件保持原样，不会留下只写了一半的工作簿。
+    替换时目标文件不能被其他程序占用（如在Excel中打开），否则抛出异常且目标文件不变。
+    """
+    folder = os.path.dirname(os.path.abspath(output_file))
+    temp_path = _create_temp_file(folder, os.path.basename(output_file))
+    try:
+        workbook.save(temp_path)
+        with open(temp_path, 'rb+') as f:
+            os.fsync(f.fileno())
+        if os.path.exists(output_file):
+            # 保留原文件的权限；新文件沿用临时文件创建时的权限
+            shutil.copymode(output_file, temp_path)
+        os.replace(temp_path, output_file)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    if hasattr(os, 'O_DIRECTORY'):
+        # 确保替换本身也写入磁盘（Windows 不支持打开文件夹，替换由系统保证）
+        try:
+            dir_fd = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            return
+        try:
+            os.fsync(dir_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
+
+
 class ExcelExporter:
-    def export_to_excel(self, data: List[Dict], output_file: str, 
+    def export_to_excel(self, data: Union[List[Dict], pd.DataFrame], output_file: str, 
                        existing_excel: Optional[Dict] = None, append_mode: bool = False, 
-                       sheet_name: str = None):
-        """导出数据到Excel，保留原有格式"""
-        # 创建数据框
-        df = pd.DataFrame(data)
+                       sheet_name: str = None, append_times: Optional[List[str]] = None):
+        """导出数据到Excel，保留原有格式
 
+        data 可以是经 value_postprocess 批量处理后的数据框，其中的数值和日期按原生类型写入。
+        新建文件时按行流式写入，见 stream_to_excel。
+        append_times 为每行的追加时间（如追加日志中记录的时间），不指定时使用当前时间。
+        """
         # 追加模式：在现有Excel文件中追加数据
         if append_mode and existing_excel and os.path.exists(existing_excel['file']):
+            # 创建数据框
+            df = pd.DataFrame(data)
             try:
-                import shutil
-                # 创建原文件的备份
-                backup_file = existing_excel['file'] + '.bak'
-                shutil.copy2(existing_excel['file'], backup_file)
-
-                try:
-                    # 使用openpyxl打开原文件以保留所有格式
-                    from openpyxl import load_workbook
-                    from copy import copy
-                    wb = load_workbook(existing_excel['file'])
-                    
-                    # 处理工作表选择
-                    if sheet_name and sheet_name in wb.sheetnames:
-                        ws = wb[sheet_name]
-                    else:
-                        ws = wb.active
-                    
-                    # 获取用户指定的标题行
-                    header_row = existing_excel['header_row'] + 1  # 从0开始转为从1开始
-
-                    # 读取标题行的内容，确保使用正确的标题行
-                    column_headers = []
-                    column_indices = {}  # 存储列名与索引的映射
-                    for idx, cell in enumerate(ws[header_row], 1):
-                        if cell.value:
-                            column_headers.append(cell.value)
-                            column_indices[cell.value] = idx
-                    
-                    # 使用pandas读取数据（从标题行开始）
-                    existing_df = pd.read_excel(
-                        existing_excel['file'], 
-                        header=existing_excel['header_row'],
-                        sheet_name=sheet_name if sheet_name else 0,
-                        engine='openpyxl'
-                    )
+                # 使用openpyxl打开原文件以保留所有格式
+                from openpyxl import load_workbook
+                wb = load_workbook(existing_excel['file'])
+                
+                # 处理工作表选择
+                if sheet_name and sheet_name in wb.sheetnames:
+                    ws = wb[sheet_name]
+                else:
+                    ws = wb.active
+                
+                # 获取用户指定的标题行
+                header_row = existing_excel['header_row'] + 1  # 从0开始转为从1开始
+                self._append_rows(ws, df, header_row, append_times)
 
-                    # 准备新数据
-                    current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    if '追加时间' in df.columns:
-                        df = df.drop('追加时间', axis=1)
-                    
-                    # 确保新数据的列与现有数据一致
-                    df = df.reindex(columns=existing_df.columns)
-                    df['追加时间'] = current_time
-
-                    # 获取最后一行的实际行号（考虑合并单元格）
-                    # 从标题行开始查找，避免被前面的合并单元格干扰
-                    last_row = header_row
-                    actual_data_rows = 0
-                    for row_idx in range(header_row + 1, ws.max_row + 1):
-                        row_empty = True
-                        for cell in ws[row_idx]:
-                            if cell.value is not None:
-                                row_empty = False
-                                break
-                        if not row_empty:
-                            last_row = row_idx
-                            actual_data_rows += 1
-                    
-                    # 如果没有实际数据行，使用标题行作为参考
-                    data_row = header_row + 1
-                    if actual_data_rows == 0:
-                        # 没有数据行，使用标题行下一行
-                        data_row = header_row + 1
-                    else:
-                        # 找到第一个有数据的行作为样式参考
-                        for row_idx in range(header_row + 1, ws.max_row + 1):
-                            row_has_data = False
-                            for cell in ws[row_idx]:
-                                if cell.value is not None:
-                                    row_has_data = True
-                                    break
-                            if row_has_data:
-                                data_row = row_idx
-                                break
-
-                    # 将新数据逐行写入
-                    for idx, row in df.iterrows():
-                        current_row = last_row + idx + 1
-                        for col_name, col_idx in column_indices.items():
-                            # 创建新单元格
-                            cell = ws.cell(row=current_row, column=col_idx)
-                            
-                            # 获取值
-                            if col_name == '追加时间':
-                                value = current_time
-                            else:
-                                value = row.get(col_name, "")
-                            cell.value = value
-                            
-                            # 复制样式（优先使用数据行样式，如果没有则使用标题行样式）
-                            source_cell = ws.cell(row=data_row, column=col_idx)
-                            if source_cell:
-                                try:
-                                    # 使用copy函数复制样式
-                                    if hasattr(source_cell, 'has_style') and source_cell.has_style:
-                                        cell._style = copy(source_cell._style)
-                                except:
-                                    # 如果样式复制失败，尝试使用标题行样式
-                                    try:
-                                        header_cell = ws.cell(row=header_row, column=col_idx)
-                                        if hasattr(header_cell, 'has_style') and header_cell.has_style:
-                                            cell._style = copy(header_cell._style)
-                                    except:
-                                        pass
-
-                    # 检查并应用合并单元格
-                    self._handle_merged_cells(ws, header_row, last_row, df)
-
-                    # 保存工作簿
-                    wb.save(output_file)
-                    # 如果保存成功，删除备份文件
-                    if os.path.exists(backup_file):
-                        os.remove(backup_file)
-
-                except Exception as e:
-                    # 如果出错，恢复备份
-                    if os.path.exists(backup_file):
-                        shutil.copy2(backup_file, existing_excel['file'])
-                    raise e
+                # 保存工作簿：保存成功前原文件不会被改动，不再需要备份
+                save_workbook(wb, output_file)
 
             except Exception as e:
-                # 确保清理备份文件
-                backup_file = existing_excel['file'] + '.bak'
-                if os.path.exists(backup_file):
-                    if not os.path.exists(existing_excel['file']):
-                        shutil.copy2(backup_file, existing_excel['file'])
-                    os.remove(backup_file)
                 raise Exception(f"追加到Excel时出错: {str(e)}")
 
         # 新建模式：创建新的Excel文件
         else:
-            if 'key' in df.columns and 'value' in df.columns:
-                df = df[['filename', 'folder', 'key', 'value']]
-            df.to_excel(output_file, index=False, engine='openpyxl')
+            if isinstance(data, pd.DataFrame):
+                self.stream_to_excel(self._frame_records(data), output_file, self._export_columns(list(data.columns)))
+            else:
+                self.stream_to_excel(data, output_file)
+
+    @staticmethod
+    def _export_columns(columns: List) -> List:
+        """key/value 形式的结果只导出文件名、文件夹、键名和值四列"""
+        if 'key' in columns and 'value' in columns:
+            return ['filename', 'folder', 'key', 'value']
+        return columns
+
+    @staticmethod
+    def _frame_records(df: pd.DataFrame) -> Iterator[Dict]:
+        """逐行产出数据框的记录，不一次性转换整个数据框"""
+        columns = list(df.columns)
+        for values in df.itertuples(index=False, name=None):
+            yield dict(zip(columns, values))
+
+    def stream_to_excel(self, records: Iterable[Dict], output_file: str, columns: Optional[List] = None) -> int:
+        """把记录逐条写入新的Excel文件，返回写入的行数
+
+        使用openpyxl的只写工作簿，每行写出后即不再保留，内存占用与记录数无关；records 可以是生成器。
+        columns 为空时由第一条记录决定：key/value 形式的结果导出文件名、文件夹、键名和值四列，
+        否则按第一条记录的键名，之后记录中多出的键被忽略，缺少的键写为空单元格。
+        价格和时间值应事先转换（如 value_postprocess.postprocess_record），日期单元格只显示年月日。
+        """
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+
+        records = iter(records)
+        first = next(records, None)
+        if columns is None:
+            columns = self._export_columns(list(first)) if first is not None else []
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet('Sheet1')
+        try:
+            ws.append(columns)
+            rows = 0
+            if first is not None:
+                for record in itertools.chain([first], records):
+                    row = []
+                    for column in columns:
+                        value = self._to_cell_value(record.get(column))
+                        if isinstance(value, datetime):
+                            cell = WriteOnlyCell(ws, value=value)
+                            cell.number_format = DATE_FORMAT
+                            value = cell
+                        row.append(value)
+                    ws.append(row)
+                    rows += 1
+            save_workbook(wb, output_file)
+        except Exception as e:
+            raise Exception(f"导出Excel时出错: {str(e)}")
+        return rows
+
+    @staticmethod
+    def _scan_sheet(worksheet, header_row: int):
+        """一次遍历标题行及其下方的单元格值，得到标题行的列名映射、最后一个数据行和第一个数据行
+
+        返回 (列名 -> 列号, 最后一个数据行, 第一个数据行)，没有数据行时后两者为 标题行 和 None。
+        """
+        column_indices = {}  # 列名与列号的映射，重复的列名以最右侧一列为准
+        last_row = header_row
+        first_row = None
+        rows = worksheet.iter_rows(min_row=header_row, max_row=worksheet.max_row,
+                                   max_col=worksheet.max_column, values_only=True)
+        for row, values in enumerate(rows, header_row):
+            if row == header_row:
+                for column, value in enumerate(values, 1):
+                    if value:
+                        column_indices[value] = column
+            elif any(value is not None for value in values):
+                last_row = row
+                if first_row is None:
+                    first_row = row
+        return column_indices, last_row, first_row
+
+    def _append_rows(self, worksheet, df: pd.DataFrame, header_row: int, append_times: Optional[List[str]] = None):
+        """将数据框按标题行的列名追加到最后一个数据行之后，样式取自第一个数据行"""
+        from openpyxl.styles.numbers import is_date_format
+        from copy import copy
+
+        column_indices, last_row, first_row = self._scan_sheet(worksheet, header_row)
+        # 没有数据行时使用标题行下一行作为样式参考
+        data_row = first_row if first_row is not None else header_row + 1
+
+        # 准备新数据
+        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if '追加时间' in df.columns:
+            df = df.drop('追加时间', axis=1)
+        row_count = len(df)
+
+        # 每列只计算一次写入的值和样式
+        columns = []
+        for col_name, col_idx in column_indices.items():
+            if col_name == '追加时间':
+                values = list(append_times) if append_times is not None else [current_time] * row_count
+            elif col_name in df.columns:
+                column_data = df[col_name]
+                if isinstance(column_data, pd.DataFrame):
+                    # 新数据中有重复列名时与 reindex 一样取第一列
+                    column_data = column_data.iloc[:, 0]
+                values = [self._to_cell_value(value) for value in column_data.tolist()]
+            else:
+                values = [None] * row_count
+            source_cell = worksheet.cell(row=data_row, column=col_idx)
+            style = source_cell._style if source_cell.has_style else None
+            columns.append([col_idx, values, style, None])  # 最后一项为该列日期单元格的样式，首次用到时生成
+
+        # 将新数据逐行写入
+        for offset in range(row_count):
+            current_row = last_row + offset + 1
+            for column in columns:
+                col_idx, values, style, date_style = column
+                value = values[offset]
+                cell = worksheet.cell(row=current_row, column=col_idx, value=value)
+                if isinstance(value, datetime):
+                    if style is None:
+                        cell.number_format = DATE_FORMAT
+                    elif date_style is None:
+                        # 参考行的样式不是日期格式时，日期单元格仍按日期显示
+                        cell._style = copy(style)
+                        if not is_date_format(cell.number_format):
+                            cell.number_format = DATE_FORMAT
+                        column[3] = copy(cell._style)
+                    else:
+                        cell._style = copy(date_style)
+                elif style is not None:
+                    cell._style = copy(style)
+
+        # 检查并应用合并单元格
+        self._handle_merged_cells(worksheet, header_row, last_row, df)
+
+    @staticmethod
+    def _to_cell_value(value):
+        """将数据框中的值转换为openpyxl可写入的原生类型，缺失值写为空单元格"""
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            return None
+        if isinstance(value, pd.Timestamp):
+            return value.to_pydatetime()
+        if hasattr(value, 'item'):
+            # numpy 标量
+            return value.item()
+        return value
             
     def _handle_merged_cells(self, worksheet, header_row, last_row, new_data):
         """处理合并单元格"""
         # 查找数据行的第一列是否有合并单元格，如果有则为新增数据添加相同的合并
+        # 相同的合并方式只记录一次，避免为每个已有的合并区域重复合并新增的行
         merged_cols = []
         for merged_range in worksheet.merged_cells.ranges:
             if merged_range.min_row > header_row and merged_range.min_col == 1:
                 # 找到数据行第一列的合并单元格
-                merged_cols.append((
+                merged_col_info = (
                     merged_range.min_col, 
                     merged_range.max_col, 
                     merged_range.max_row - merged_range.min_row + 1
-                ))
+                )
+                if merged_col_info not in merged_cols:
+                    merged_cols.append(merged_col_info)
         
         # 为新增数据应用相同的合并规则
         for merged_col_info in merged_cols:
@@ -190,3 +289,11 @@ class ExcelExporter:
         except Exception as e:
             print(f"获取工作表出错: {str(e)}")
             return []
+
+    def get_excel_columns(self, excel_file: str, header_row: int, sheet_name: str = None) -> List:
+        """读取指定工作表标题行（从0开始）的列名，与界面选择现有Excel时读取的列名一致"""
+        try:
+            df = pd.read_excel(excel_file, header=header_row, sheet_name=sheet_name if sheet_name else 0, nrows=0)
+            return list(df.columns)
+        except Exception as e:
+            raise Exception(f"读取标题行错误: {str(e)}")
@@ -0,0 +1,194 @@
+import time
+from typing import Dict, Iterator, Iterable, Optional
+
+# 计时阶段：打开文档与创建页面、解析页面内容、表格识别、文本块分组、键名匹配、去重
+STAGES = ['open', 'parse', 'tables', 'text_blocks', 'matching', 'dedup']
+STAGE_NAMES = {
+    'open': '打开',
+    'parse': '解析',
+    'tables': '表格',
+    'text_blocks': '文本块',
+    'matching': '匹配',
+    'dedup': '去重'
+}
+# 计数项：页数、预筛选或模板跳过的页数、字符、表格、单元格、词、文本块、原始结果、最终结果、缓存命中、
+# 失败的文档、因内存超限降级处理的文档
+COUNTERS = ['pages', 'skipped_pages', 'chars', 'tables', 'cells', 'words', 'blocks', 'raw_results', 'results', 'cache_hits',
+            'failed', 'degraded']
+
+
+class _NullStage:
+    """未启用统计时使用的空计时器"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class NullStats:
+    """未启用统计时的空实现，所有调用都不做任何事，开销可以忽略"""
+    enabled = False
+
+    def begin_document(self, file_path: str):
+        pass
+
+    def end_document(self):
+        pass
+
+    def stage(self, name: str):
+        return _NULL_STAGE
+
+    def iterate(self, name: str, iterator: Iterable) -> Iterable:
+        return iterator
+
+    def count(self, name: str, amount: int = 1):
+        pass
+
+    def count_tables(self, tables):
+        pass
+
+    def reset(self):
+        pass
+
+    def absorb(self, file_path: str, result):
+        return result
+
+
+class _Stage:
+    """把 with 块的用时累加到当前文档的指定阶段"""
+    __slots__ = ('stats', 'name', 'started')
+
+    def __init__(self, stats: 'ExtractionStats', name: str):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stats._add_time(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def _empty_document() -> Dict:
+    return {'seconds': dict.fromkeys(STAGES, 0.0), 'counts': dict.fromkeys(COUNTERS, 0), 'total': 0.0}
+
+
+class ExtractionStats:
+    """分阶段计时和计数
+
+    documents 中保存每个文档的统计，totals() 汇总本次批量处理的全部文档。
+    多进程处理时工作进程中的文档统计随结果返回，由 absorb 并入主进程。
+    """
+    enabled = True
+
+    def __init__(self):
+        self.documents: Dict[str, Dict] = {}
+        self._current: Optional[Dict] = None
+        self._started = 0.0
+
+    def reset(self):
+        self.documents = {}
+        self._current = None
+
+    def begin_document(self, file_path: str):
+        self._current = _empty_document()
+        self.documents[file_path] = self._current
+        self._started = time.perf_counter()
+
+    def end_document(self):
+        if self._current is not None:
+            self._current['total'] = time.perf_counter() - self._started
+            self._current = None
+
+    def stage(self, name: str) -> _Stage:
+        return _Stage(self, name)
+
+    def iterate(self, name: str, iterator: Iterable) -> Iterator:
+        """逐项产出 iterator 的内容，每次取下一项的用时计入指定阶段"""
+        iterator = iter(iterator)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._add_time(name, time.perf_counter() - started)
+            yield item
+
+    def count(self, name: str, amount: int = 1):
+        if self._current is not None:
+            self._current['counts'][name] += amount
+
+    def count_tables(self, tables):
+        self.count('tables', len(tables))
+        self.count('cells', sum(len(row) for table in tables for row in table))
+
+    def _add_time(self, name: str, seconds: float):
+        if self._current is not None:
+            self._current['seconds'][name] += seconds
+
+    def pop_document(self, file_path: str) -> Optional[Dict]:
+        """取出并移除一个文档的统计，工作进程用它把统计随结果返回"""
+        return self.documents.pop(file_path, None)
+
+    def absorb(self, file_path: str, result):
+        """并入工作进程随结果返回的文档统计，返回去掉统计信息后的结果
+
+        失败的文档计入 failed；超时或进程崩溃时没有随结果返回的统计，只记录失败本身。
+        """
+        document = getattr(result, 'stats', None)
+        if document is not None:
+            self.documents[file_path] = document
+            if not isinstance(result, Exception):
+                return list(result)
+            del result.stats
+        if isinstance(result, Exception):
+            # 同一结果可能被并入多次，计数直接置1
+            self.documents.setdefault(file_path, _empty_document())['counts']['failed'] = 1
+        return result
+
+    def totals(self) -> Dict:
+        """汇总所有文档的各阶段用时和计数"""
+        totals = _empty_document()
+        for document in self.documents.values():
+            for name, seconds in document['seconds'].items():
+                totals['seconds'][name] += seconds
+            for name, amount in document['counts'].items():
+                totals['counts'][name] += amount
+            totals['total'] += document['total']
+        totals['documents'] = len(self.documents)
+        return totals
+
+    def summary(self) -> str:
+        """一行的分阶段用时摘要，用于状态栏显示"""
+        totals = self.totals()
+        counts = totals['counts']
+        stages = "，".join(f"{STAGE_NAMES[name]} {totals['seconds'][name]:.1f}s" for name in STAGES)
+        skipped = f"（跳过 {counts['skipped_pages']} 页）" if counts['skipped_pages'] else ""
+        return (f"{totals['documents']} 个文档 {counts['pages']} 页{skipped}，用时 {totals['total']:.1f}s（{stages}）；"
+                f"表格 {counts['tables']}，文本块 {counts['blocks']}，结果 {counts['raw_results']}→{counts['results']}"
+                + (f"，失败 {counts['failed']}" if counts['failed'] else "")
+                + (f"，降级 {counts['degraded']}" if counts['degraded'] else ""))
+
+
+class StatsList(list):
+    """附带文档统计的提取结果，用于从工作进程传回统计"""
+    stats = None
+
+
+def attach_stats(result, document: Optional[Dict]):
+    """把文档统计附加到结果（列表或异常）上，以便随结果跨进程传递"""
+    if document is None:
+        return result
+    if not isinstance(result, Exception):
+        result = StatsList(result)
+    result.stats = document
+    return result
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+from typing import List, Dict, Optional, Iterator, Tuple
+
+# 清单格式变化时递增，旧清单自动作废
+MANIFEST_VERSION = 1
+
+
+def parse_keywords(text: str) -> List[str]:
+    """解析逗号分隔的文件名过滤关键词"""
+    return [k.strip() for k in (text or '').split(',') if k.strip()]
+
+
+def _matches(name: str, keywords: Optional[List[str]]) -> bool:
+    return not keywords or any(k in name for k in keywords)
+
+
+def _list_dir(folder: str) -> Iterator[Tuple[os.DirEntry, bool]]:
+    """按目录顺序列出PDF文件和子文件夹，产出 (DirEntry, 是否为文件夹)
+
+    DirEntry 缓存了目录读取时得到的类型信息，大多数系统上判断文件或文件夹不需要额外的stat调用。
+    """
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith('.pdf') and entry.is_file():
+                yield entry, False
+            elif entry.is_dir():
+                yield entry, True
+
+
+def scan_pdf_files(folder: str, keywords: Optional[List[str]] = None, recursive: bool = True,
+                   manifest_path: Optional[str] = None) -> List[str]:
+    """列出文件夹中文件名包含任一关键词的PDF文件，关键词为空时不过滤
+
+    指定 manifest_path 时使用扫描清单，只重新读取内容有变化的文件夹。
+    """
+    if manifest_path:
+        return FolderManifest(folder, manifest_path).scan(keywords, recursive)['files']
+    folder_files = []
+    for entry, is_dir in _list_dir(folder):
+        if not is_dir:
+            if _matches(entry.name, keywords):
+                folder_files.append(entry.path)
+        elif recursive:
+            folder_files.extend(scan_pdf_files(entry.path, keywords, recursive))
+    return folder_files
+
+
+def manifest_path_for(root: str, manifest_dir: str) -> str:
+    """每个根文件夹一个清单文件，文件名由根路径的哈希得到"""
+    digest = hashlib.sha1(os.path.abspath(root).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(manifest_dir, f"{digest}.json")
+
+
+class FolderManifest:
+    """文件夹扫描清单：记录每个文件夹的修改时间和其中的PDF文件（路径、大小、修改时间、页数）
+
+    再次扫描时只对修改时间变化的文件夹重新列目录并读取文件信息，
+    未变化的文件夹沿用清单中的记录，因此大量文件的共享目录也能在数秒内得到新增和修改的PDF。
+    注意：就地覆盖文件不会改变所在文件夹的修改时间，需要时可用 verify_files=True 逐个检查文件。
+    """
+
+    def __init__(self, root: str, manifest_path: str):
+        self.root = os.path.abspath(root)
+        self.manifest_path = manifest_path
+        self.dirs: Dict[str, Dict] = {}   # 相对路径 -> {'mtime', 'entries': [[名称, 是否为文件夹], ...]}
+        self.files: Dict[str, Dict] = {}  # 相对路径 -> {'size', 'mtime', 'pages'}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == MANIFEST_VERSION and data.get('root') == self.root:
+            self.dirs = data.get('dirs', {})
+            self.files = data.get('files', {})
+
+    def save(self):
+        """写入临时文件后替换，中途出错不会留下损坏的清单"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.manifest_path)), exist_ok=True)
+        temp_path = self.manifest_path + '.tmp'
+        # json.dumps 使用C实现的编码器，比直接 json.dump 到文件快得多
+        payload = json.dumps({'version': MANIFEST_VERSION, 'root': self.root, 'dirs': self.dirs, 'files': self.files},
+                             ensure_ascii=False, separators=(',', ':'))
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(temp_path, self.manifest_path)
+
+    def scan(self, keywords: Optional[List[str]] = None, recursive: bool = True,
+             with_pages: bool = False, verify_files: bool = False, save: bool = True) -> Dict[str, List[str]]:
+        """扫描根文件夹并更新清单
+
+        返回 {'files': 符合关键词的全部PDF, 'new': 新增的, 'modified': 大小或修改时间变化的,
+        'removed': 已删除的}，均为绝对路径且只包含符合关键词的文件，files 保持目录顺序。
+        with_pages 为 True 时为符合关键词且尚未记录页数的PDF读取页数。
+        """
+        if with_pages:
+            # 只在需要页数时加载PDF库，配置管理等只用到清单路径的模块不依赖它
+            from pdf_backends import count_pages
+        changes = {'files': [], 'new': [], 'modified': [], 'removed': []}
+        seen_dirs = set()
+        seen_files = set()
+        dirty = False  # 清单内容是否有变化，没有变化时不重写清单
+
+        def stat_file(rel: str, path: str, stat_result, name: str):
+            nonlocal dirty
+            previous = self.files.get(rel)
+            record = {'size': stat_result.st_size, 'mtime': stat_result.st_mtime_ns, 'pages': None}
+            wanted = _matches(name, keywords)
+            if previous is None:
+                if wanted:
+                    changes['new'].append(path)
+            elif previous['size'] != record['size'] or previous['mtime'] != record['mtime']:
+                if wanted:
+                    changes['modified'].append(path)
+            else:
+                record['pages'] = previous.get('pages')
+            if record != previous:
+                dirty = True
+            self.files[rel] = record
+
+        def walk(rel_dir: str):
+            nonlocal dirty
+            seen_dirs.add(rel_dir)
+            folder = os.path.join(self.root, rel_dir) if rel_dir else self.root
+            mtime = os.stat(folder).st_mtime_ns
+            cached = self.dirs.get(rel_dir)
+            if cached is not None and cached['mtime'] == mtime:
+                entries = cached['entries']
+                for name, is_dir in entries:
+                    if not is_dir and verify_files:
+                        rel = os.path.join(rel_dir, name)
+                        path = os.path.join(folder, name)
+                        try:
+                            stat_file(rel, path, os.stat(path), name)
+                        except OSError:
+                            continue
+            else:
+                # 文件夹有变化：重新列目录，文件信息直接取自 DirEntry
+                entries = []
+                for entry, is_dir in _list_dir(folder):
+                    entries.append([entry.name, is_dir])
+                    if not is_dir:
+                        try:
+                            stat_file(os.path.join(rel_dir, entry.name), entry.path, entry.stat(), entry.name)
+                        except OSError:
+                            entries.pop()  # 列目录后被删除的文件
+                self.dirs[rel_dir] = {'mtime': mtime, 'entries': entries}
+                dirty = True
+
+            for name, is_dir in entries:
+                rel = os.path.join(rel_dir, name)
+                if is_dir:
+                    if recursive:
+                        try:
+                            walk(rel)
+                        except OSError:
+                            # 子文件夹已被删除或无法访问：其中的文件会从清单中移除，
+                            # 文件夹记录也一并移除，恢复访问后重新列目录而不是沿用旧的目录内容
+                            seen_dirs.discard(rel)
+                            self.dirs.pop(rel, None)
+                            dirty = True
+                            continue
+                else:
+                    seen_files.add(rel)
+                    if _matches(name, keywords):
+                        path = os.path.join(folder, name)
+                        changes['files'].append(path)
+                        record = self.files[rel]
+                        if with_pages and record.get('pages') is None:
+                            record['pages'] = count_pages(path)
+                            dirty = True
+
+        walk('')
+
+        # 本次扫描范围内不再存在的文件和文件夹从清单中移除
+        for rel in list(self.files):
+            if rel not in seen_files and (recursive or os.path.dirname(rel) == ''):
+                if _matches(os.path.basename(rel), keywords):
+                    changes['removed'].append(os.path.join(self.root, rel))
+                del self.files[rel]
+                dirty = True
+        if recursive:
+            for rel in list(self.dirs):
+                if rel not in seen_dirs:
+                    del self.dirs[rel]
+                    dirty = True
+
+        if save and dirty:
+            try:
+                self.save()
+            except OSError as e:
+                print(f"保存扫描清单出错: {str(e)}")
+        return changes
+
+    def forget(self, file_paths: List[str]):
+        """从清单中移除指定文件，下次扫描时它们会重新作为新增文件报告"""
+        for file_path in file_paths:
+            rel = os.path.relpath(os.path.abspath(file_path), self.root)
+            self.files.pop(rel, None)
+            folder = self.dirs.get(os.path.dirname(rel))
+            if folder is not None:
+                folder['mtime'] = None  # 使所在文件夹在下次扫描时重新列目录
+
+    def pages(self, file_path: str) -> Optional[int]:
+        """清单中记录的页数，未记录时返回None"""
+        record = self.files.get(os.path.relpath(os.path.abspath(file_path), self.root))
+        return record.get('pages') if record else None
@@ -0,0 +1,145 @@
+import os
+import time
+from typing import List, Dict, Optional, Callable
+
+import pandas as pd
+
+from append_journal import append_to_excel
+from excel_exporter import ExcelExporter
+from file_scanner import FolderManifest
+from pdf_processor import PDFProcessor
+from project_grouping import project_rows, project_values
+from value_postprocess import postprocess_columns
+
+
+class FolderWatcher:
+    """监视文件夹：定期比较扫描清单找出新增或修改的PDF，分批提取并追加到现有Excel
+
+    每轮轮询只重新读取修改时间变化的文件夹，开销与变化的文件数相关，而不是与整个归档的大小相关。
+    就地覆盖文件不会改变文件夹的修改时间，因此启动时和每 verify_every 轮轮询逐个读取全部文件的信息，
+    verify_every 为0时不检查。
+    新文件在连续两次轮询中大小和修改时间都不变后才视为复制完成并参与提取。
+    处理结果按 project_values 的规则分组（与"新增表格信息"相同），每个项目追加一行。
+    追加失败（如Excel正被打开）时文件保留在待处理队列中，下一批次重试。
+    Excel的追加日志中有待写入的行时，新行接在其后一起写入。
+    """
+
+    def __init__(self, root: str, processor: PDFProcessor, existing_excel: Dict, manifest_path: str,
+                 project_mode: str = 'same', keywords: Optional[List[str]] = None, recursive: bool = True,
+                 poll_interval: float = 30, batch_interval: float = 300, workers: Optional[int] = None,
+                 timeout: Optional[float] = None, memory_limit_mb: Optional[float] = None,
+                 verify_every: int = 10):
+        self.root = os.path.abspath(root)
+        self.processor = processor
+        self.existing_excel = existing_excel
+        self.project_mode = project_mode
+        self.keywords = keywords
+        self.recursive = recursive
+        self.poll_interval = poll_interval
+        self.batch_interval = batch_interval
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.verify_every = verify_every
+        self.manifest = FolderManifest(self.root, manifest_path)
+        self.exporter = ExcelExporter()
+        self._pending: Dict[str, Optional[tuple]] = {}  # 文件路径 -> 上次轮询时的 (大小, 修改时间)
+        self._ready: List[str] = []  # 已复制完成、等待下一批次处理的文件
+        self._last_flush = time.monotonic()
+        self._polls = 0
+
+    def start(self, ingest_existing: bool = False) -> int:
+        """建立基准清单
+
+        首次监视某个文件夹时，已有的文件默认视为已处理，只有之后新增或修改的文件会被追加；
+        ingest_existing 为 True 时已有文件也加入待处理队列。
+        已有清单（上次监视留下）时，停止监视期间新增或修改的文件会被补充处理。
+        返回加入待处理队列的文件数。
+        """
+        first_run = not self.manifest.dirs
+        changes = self.manifest.scan(self.keywords, self.recursive, verify_files=self.verify_every > 0, save=False)
+        if first_run and not ingest_existing:
+            self.manifest.save()
+            return 0
+        self._queue(changes['new'] + changes['modified'])
+        self._save_manifest()
+        return len(self._pending)
+
+    def _queue(self, file_paths: List[str]):
+        for file_path in file_paths:
+            if file_path not in self._ready:
+                self._pending.setdefault(file_path, None)
+
+    def poll(self) -> int:
+        """轮询一次：找出新增或修改的文件，并把复制完成的文件移入就绪队列，返回就绪文件数"""
+        self._polls += 1
+        verify_files = self.verify_every > 0 and self._polls % self.verify_every == 0
+        changes = self.manifest.scan(self.keywords, self.recursive, verify_files=verify_files, save=False)
+        self._queue(changes['new'] + changes['modified'])
+        for file_path in changes['removed']:
+            self._pending.pop(file_path, None)
+
+        # 只对待处理的文件逐个读取文件信息，判断是否仍在写入
+        for file_path, previous in list(self._pending.items()):
+            try:
+                stat_result = os.stat(file_path)
+            except OSError:
+                del self._pending[file_path]
+                continue
+            current = (stat_result.st_size, stat_result.st_mtime_ns)
+            if current == previous and stat_result.st_size > 0:
+                del self._pending[file_path]
+                self._ready.append(file_path)
+            else:
+                self._pending[file_path] = current
+        return len(self._ready)
+
+    def flush(self) -> Optional[Dict]:
+        """处理就绪队列中的文件并追加到Excel，没有就绪文件时返回None"""
+        if not self._ready:
+            return None
+        files = list(self._ready)
+        started = time.monotonic()
+        results = self.processor.process_many(
+            files, workers=self.workers, timeout=self.timeout, memory_limit_mb=self.memory_limit_mb)
+        projects, skipped_folders = project_values(files, dict(zip(files, results)), self.project_mode)
+        rows = project_rows(projects, self.existing_excel['columns'])
+        if rows:
+            # 追加失败时抛出异常，文件保留在就绪队列中等待下一批次
+            append_to_excel(postprocess_columns(pd.DataFrame(rows)), self.existing_excel, self.exporter)
+        self._ready = [file_path for file_path in self._ready if file_path not in files]
+        self._last_flush = time.monotonic()
+        self._save_manifest()
+        return {
+            'files': files,
+            'rows': len(rows),
+            'failures': list(self.processor.failures),
+            'skipped_folders': skipped_folders,
+            'seconds': time.monotonic() - started
+        }
+
+    def _save_manifest(self):
+        """保存清单，尚未追加的文件不记入清单，中断后重新启动时会再次被发现"""
+        self.manifest.forget(list(self._pending) + self._ready)
+        try:
+            self.manifest.save()
+        except OSError as e:
+            print(f"保存扫描清单出错: {str(e)}")
+
+    def run(self, should_stop: Optional[Callable[[], bool]] = None,
+            on_batch: Optional[Callable[[Dict], None]] = None,
+            on_error: Optional[Callable[[Exception], None]] = None):
+        """持续轮询直到 should_stop() 返回True；每隔 batch_interval 秒把就绪文件作为一批追加"""
+        while not (should_stop and should_stop()):
+            self.poll()
+            if self._ready and time.monotonic() - self._last_flush >= self.batch_interval:
+                try:
+                    batch = self.flush()
+                except Exception as e:
+                    self._last_flush = time.monotonic()  # 等待下一个批次间隔后重试
+                    if on_error:
+                        on_error(e)
+                else:
+                    if batch and on_batch:
+                        on_batch(batch)
+            time.sleep(self.poll_interval)
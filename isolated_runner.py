@@ -0,0 +1,245 @@
+import csv
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from typing import List, Dict, Optional, Callable
+
+# 轮询工作进程状态的间隔（秒）
+POLL_INTERVAL = 0.2
+
+
+class FileProcessingError(Exception):
+    """单个文件处理失败，reason 为 'timeout'、'memory'、'crash' 或 'error'"""
+
+    def __init__(self, file_path: str, reason: str, message: str):
+        super().__init__(message)
+        self.file_path = file_path
+        self.reason = reason
+
+    def __reduce__(self):
+        # 从工作进程传回时按构造参数重建，附加的属性（如文档统计）一并保留
+        return self.__class__, (self.file_path, self.reason, str(self)), self.__dict__
+
+
+class ProcessingCancelled(Exception):
+    """批量处理被用户取消"""
+
+
+def process_rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """进程的常驻内存（MB），默认为当前进程，无法获取时返回None"""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ('cb', wintypes.DWORD),
+                    ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t),
+                    ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t),
+                    ('PeakPagefileUsage', ctypes.c_size_t),
+                ]
+
+            kernel32 = ctypes.windll.kernel32
+            if pid is None:
+                handle = kernel32.GetCurrentProcess()
+            else:
+                # PROCESS_QUERY_LIMITED_INFORMATION | PROCESS_VM_READ
+                handle = kernel32.OpenProcess(0x1000 | 0x0010, False, pid)
+                if not handle:
+                    return None
+            try:
+                counters = PROCESS_MEMORY_COUNTERS()
+                counters.cb = ctypes.sizeof(counters)
+                if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                    return None
+                return counters.WorkingSetSize / (1024 * 1024)
+            finally:
+                if pid is not None:
+                    kernel32.CloseHandle(handle)
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
+
+
+def _worker_main(conn, initializer: Callable, initargs: tuple, task: Callable):
+    """工作进程主循环：初始化一次，然后逐个处理主进程发来的文件"""
+    initializer(*initargs)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        idx, argument = message
+        try:
+            result = task(argument)
+        except Exception as e:
+            result = e
+        conn.send((idx, result))
+
+
+class _Worker:
+    """受监管的工作进程及其当前任务"""
+
+    def __init__(self, context, initializer: Callable, initargs: tuple, task: Callable):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, initializer, initargs, task), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.task_idx = None
+        self.started = None
+
+    def assign(self, idx: int, argument):
+        self.task_idx = idx
+        self.started = time.monotonic()
+        self.conn.send((idx, argument))
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(5)
+        finally:
+            self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, EOFError):
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class IsolatedRunner:
+    """隔离执行：每个文件在受监管的工作进程中处理
+
+    超时或内存超限的工作进程会被终止并重启，失败原因记录在 failures 中，
+    一个异常文件不会拖住整个批次。
+    """
+
+    def __init__(self, initializer: Callable, initargs: tuple, task: Callable, workers: int = 1,
+                 timeout: Optional[float] = None, memory_limit_mb: Optional[float] = None):
+        self.initializer = initializer
+        self.initargs = initargs
+        self.task = task
+        self.workers = max(1, workers)
+        self.timeout = timeout if timeout and timeout > 0 else None
+        self.memory_limit_mb = memory_limit_mb if memory_limit_mb and memory_limit_mb > 0 else None
+        self.failures: List[Dict] = []
+        self.cancelled = False
+
+    def run(self, file_paths: List[str], schedule: Optional[List[int]] = None,
+            progress_callback: Optional[Callable] = None,
+            should_cancel: Optional[Callable[[], bool]] = None) -> List:
+        """按 schedule 顺序处理文件，返回与 file_paths 顺序一致的结果列表
+
+        should_cancel() 返回True时不再分配新文件，正在处理的工作进程被终止，
+        self.cancelled 置为True，未完成的文件在结果中为None。
+        """
+        self.cancelled = False
+        results = [None] * len(file_paths)
+        pending = deque(schedule if schedule is not None else range(len(file_paths)))
+        context = multiprocessing.get_context()
+        workers = []
+
+        def spawn():
+            return _Worker(context, self.initializer, self.initargs, self.task)
+
+        def finish(worker, result):
+            idx = worker.task_idx
+            worker.task_idx = None
+            if isinstance(result, Exception) and not isinstance(result, FileProcessingError):
+                error = FileProcessingError(file_paths[idx], 'error', str(result))
+                # 工作进程随异常返回的文档统计一并保留
+                if getattr(result, 'stats', None) is not None:
+                    error.stats = result.stats
+                result = error
+            if isinstance(result, FileProcessingError):
+                self.failures.append({
+                    'file': file_paths[idx],
+                    'reason': result.reason,
+                    'message': str(result)
+                })
+            results[idx] = result
+            if progress_callback:
+                progress_callback(file_paths[idx], result)
+
+        def replace(worker, reason, message):
+            """终止出问题的工作进程，记录失败并换上新进程"""
+            worker.kill()
+            finish(worker, FileProcessingError(file_paths[worker.task_idx], reason, message))
+            workers[workers.index(worker)] = spawn()
+
+        try:
+            for _ in range(min(self.workers, len(pending))):
+                workers.append(spawn())
+
+            while pending or any(worker.task_idx is not None for worker in workers):
+                if should_cancel and should_cancel():
+                    # 正在处理的工作进程在 finally 中终止
+                    self.cancelled = True
+                    break
+                for worker in workers:
+                    if worker.task_idx is None and pending:
+                        idx = pending.popleft()
+                        worker.assign(idx, file_paths[idx])
+                busy = [worker for worker in workers if worker.task_idx is not None]
+                ready = wait([worker.conn for worker in busy], timeout=POLL_INTERVAL)
+
+                for worker in busy:
+                    name = os.path.basename(file_paths[worker.task_idx])
+                    if worker.conn in ready:
+                        try:
+                            _, result = worker.conn.recv()
+                        except (EOFError, OSError):
+                            replace(worker, 'crash', f"{name} 处理进程异常退出")
+                            continue
+                        finish(worker, result)
+                    elif not worker.process.is_alive():
+                        replace(worker, 'crash', f"{name} 处理进程异常退出")
+                    elif self.timeout and time.monotonic() - worker.started > self.timeout:
+                        replace(worker, 'timeout', f"{name} 处理超时（超过 {self.timeout:g} 秒）")
+                    elif self.memory_limit_mb:
+                        rss_mb = process_rss_mb(worker.process.pid)
+                        if rss_mb is not None and rss_mb > self.memory_limit_mb:
+                            replace(worker, 'memory',
+                                    f"{name} 内存占用 {rss_mb:.0f}MB 超过上限 {self.memory_limit_mb:g}MB")
+        finally:
+            for worker in workers:
+                if worker.task_idx is None:
+                    worker.stop()
+                else:
+                    worker.kill()
+
+        return results
+
+
+def write_failure_report(failures: List[Dict], report_file: str):
+    """将失败文件及原因写入CSV报告"""
+    reasons = {'timeout': '超时', 'memory': '内存超限', 'crash': '进程崩溃', 'error': '处理出错',
+               'degraded': '内存超限降级处理'}
+    with open(report_file, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(['文件', '原因', '详细信息'])
+        for failure in failures:
+            writer.writerow([
+                failure['file'],
+                reasons.get(failure['reason'], failure['reason']),
+                failure['message']
+            ])
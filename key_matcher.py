@@ -0,0 +1,160 @@
+from typing import List, Dict, Optional
+
+
+class _Automaton:
+    """Aho-Corasick 多模式匹配自动机，一次扫描找出文本中出现的所有模式"""
+
+    def __init__(self, patterns: List[str]):
+        # 每个状态：转移表、失败指针、在此结束的模式编号
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self._lengths = [len(p) for p in patterns]
+
+        for pattern_id, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._output[state].append(pattern_id)
+
+        # 广度优先构建失败指针，并合并输出
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def search(self, text: str):
+        """依次产出 (模式编号, 起始位置)"""
+        goto, fail, output, lengths = self._goto, self._fail, self._output, self._lengths
+        state = 0
+        for pos, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in output[state]:
+                yield pattern_id, pos - lengths[pattern_id] + 1
+
+
+class _PatternIndex:
+    """按模板顺序返回与文本宽松匹配的模板编号
+
+    时间类模板只接受以模板开头的文本；其他模板接受互相包含的文本。
+    """
+
+    def __init__(self, patterns: List[str], prefix_only: List[bool]):
+        self.count = len(patterns)
+        self._prefix_only = prefix_only
+        self._automaton = _Automaton(patterns)
+        # 空模板与任何文本都匹配
+        self._always = [idx for idx, pattern in enumerate(patterns) if not pattern]
+        # 文本被模板包含：预先登记非时间类模板的全部子串
+        self._substrings: Dict[str, List[int]] = {}
+        for idx, pattern in enumerate(patterns):
+            if prefix_only[idx]:
+                continue
+            seen = set()
+            for start in range(len(pattern) + 1):
+                for end in range(start, len(pattern) + 1):
+                    sub = pattern[start:end]
+                    if sub not in seen:
+                        seen.add(sub)
+                        self._substrings.setdefault(sub, []).append(idx)
+        self._cache: Dict[str, List[int]] = {}
+
+    def matches(self, text: str) -> List[int]:
+        result = self._cache.get(text)
+        if result is not None:
+            return result
+        matched = set(self._always)
+        for idx, start in self._automaton.search(text):
+            if start == 0 or not self._prefix_only[idx]:
+                matched.add(idx)
+        matched.update(self._substrings.get(text, ()))
+        result = sorted(matched)
+        # 表单中的标签高度重复，缓存规模有限时记住结果
+        if len(self._cache) < 10000:
+            self._cache[text] = result
+        return result
+
+
+class KeyMatcher:
+    """键名匹配索引，由表格、文本块和去重流程共用
+
+    templates 为 PDFProcessor 中已标准化的键名列表，所有匹配结果均返回模板下标。
+    """
+
+    def __init__(self, templates: List[str]):
+        self.templates = list(templates)
+        is_time = ['时间' in template for template in self.templates]
+
+        # 严格匹配：哈希表，重复键名取第一个
+        self._exact: Dict[str, int] = {}
+        for idx, template in enumerate(self.templates):
+            self._exact.setdefault(template, idx)
+
+        # 表格宽松匹配使用完整模板
+        self._loose = _PatternIndex(self.templates, is_time)
+
+        # 去重时非时间类键名只比较括号前的部分
+        bases = [
+            template if is_time[idx] else template.split('(')[0].split('（')[0]
+            for idx, template in enumerate(self.templates)
+        ]
+        self._result = _PatternIndex(bases, is_time)
+
+        # 文本块键名判断：文本中包含任一键名（或去掉单位后的键名）
+        key_patterns = []
+        self._pattern_owner: List[int] = []  # 模式编号 -> 模板下标
+        for idx, template in enumerate(self.templates):
+            key_patterns.append(template)
+            self._pattern_owner.append(idx)
+            variant = template.replace("（元）", "").replace("(元)", "")
+            if variant != template:
+                key_patterns.append(variant)
+                self._pattern_owner.append(idx)
+        self._has_empty_key = any(not pattern for pattern in key_patterns)
+        self._contains = _Automaton(key_patterns)
+
+    def exact(self, text: str) -> Optional[int]:
+        """严格匹配：标准化文本与模板完全相等"""
+        return self._exact.get(text)
+
+    def loose(self, text: str) -> List[int]:
+        """表格宽松匹配的候选模板，按模板顺序排列"""
+        return self._loose.matches(text)
+
+    def result_matches(self, text: str) -> List[int]:
+        """去重时接受该结果键名的模板，按模板顺序排列"""
+        return self._result.matches(text)
+
+    def contains_key(self, text: str) -> bool:
+        """文本中是否包含任一键名"""
+        if self._has_empty_key:
+            return True
+        for _ in self._contains.search(text):
+            return True
+        return False
+
+    def find_keys(self, text: str):
+        """依次产出文本中出现的键名 (模板下标, 起始位置)"""
+        owner = self._pattern_owner
+        for pattern_id, start in self._contains.search(text):
+            yield owner[pattern_id], start
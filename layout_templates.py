@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import List, Dict, Optional
+
+from key_matcher import KeyMatcher
+from pdf_backends import document_page_count
+
+# 模板区域向外扩展的边距，容纳同一版式下的细微位置差异
+REGION_PADDING = 5
+
+
+def layout_fingerprint(context, key_matcher: KeyMatcher) -> Optional[str]:
+    """根据页数、首页尺寸和首页键名标签的位置生成版面指纹，首页没有任何键名时返回None"""
+    # 与预筛选相同的标准化：去除空白、统一括号、转小写，同时记录每个字符的来源
+    text_parts = []
+    sources = []
+    for char in context.chars:
+        for ch in char['text']:
+            if ch.isspace():
+                continue
+            if ch == '（':
+                ch = '('
+            elif ch == '）':
+                ch = ')'
+            for lowered in ch.lower():
+                text_parts.append(lowered)
+                sources.append(char)
+
+    labels = set()
+    for template_idx, start in key_matcher.find_keys(''.join(text_parts)):
+        char = sources[start]
+        labels.add((template_idx, round(char['x0']), round(char['top'])))
+    if not labels:
+        return None
+
+    page = context.page
+    encoded = json.dumps([document_page_count(page.pdf.doc), round(page.width), round(page.height), sorted(labels)])
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class LayoutTemplateStore:
+    """基于SQLite的版面模板库，键为版面指纹加键名配置指纹"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = None
+        self._memory: Dict[str, Dict] = {}  # 本进程内已读取的模板
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            db_dir = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(db_dir, exist_ok=True)
+            # 多个工作进程可能同时写入，设置等待超时并使用WAL模式
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS templates ("
+                "fingerprint TEXT PRIMARY KEY, "
+                "payload TEXT NOT NULL, "
+                "updated REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        """读取模板，未命中返回None"""
+        template = self._memory.get(fingerprint)
+        if template is not None:
+            return template
+        try:
+            row = self._connect().execute(
+                "SELECT payload FROM templates WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+            if row is None:
+                return None
+            template = json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            print(f"读取版面模板出错: {str(e)}")
+            return None
+        self._memory[fingerprint] = template
+        return template
+
+    def put(self, fingerprint: str, template: Dict):
+        """写入或替换模板"""
+        self._memory[fingerprint] = template
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO templates (fingerprint, payload, updated) VALUES (?, ?, ?)",
+                (fingerprint, json.dumps(template), time.time())
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"写入版面模板出错: {str(e)}")
+
+    def clear(self):
+        """清空所有模板"""
+        self._memory.clear()
+        try:
+            conn = self._connect()
+            conn.execute("DELETE FROM templates")
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"清空版面模板出错: {str(e)}")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class LayoutSession:
+    """单个文档的版面模板会话
+
+    首页确定版面指纹后，命中模板时只解析模板记录的页面，并只在记录的区域内识别表格；
+    未命中时记录本次提取中产生结果的页面和表格区域，提取完成后保存为模板。
+    只有取得全部键名的提取才保存为模板，套用模板也必须取得全部键名才被接受，
+    否则模板页面和区域之外的键名会被遗漏。
+    """
+
+    def __init__(self, store: LayoutTemplateStore, key_matcher: KeyMatcher, options_fingerprint: str):
+        self.store = store
+        self.key_matcher = key_matcher
+        self.options_fingerprint = options_fingerprint
+        self.fingerprint = None
+        self.template = None
+        self._lookup = True
+        self._pages: Dict[str, Optional[List[float]]] = {}
+
+    def begin(self, context):
+        """由首页计算版面指纹并查找模板"""
+        fingerprint = layout_fingerprint(context, self.key_matcher)
+        if fingerprint is None:
+            return
+        self.fingerprint = f"{fingerprint}:{self.options_fingerprint}"
+        if self._lookup:
+            self.template = self.store.get(self.fingerprint)
+
+    @property
+    def last_page(self) -> int:
+        return self.template['last_page']
+
+    def covers(self, page_number: int) -> bool:
+        """模板中该页是否产生过结果"""
+        return str(page_number) in self.template['pages']
+
+    def table_region(self, page_number: int) -> Optional[List[float]]:
+        """模板记录的表格区域，该页表格未产生结果时为None"""
+        return self.template['pages'].get(str(page_number))
+
+    def record(self, page_number: int, page_results: List[Dict], table_bboxes: List[tuple]):
+        """记录产生结果的页面及其中产生结果的表格所占区域"""
+        if self.template is not None or self.fingerprint is None or not page_results:
+            return
+        region = None
+        if table_bboxes:
+            region = [
+                min(bbox[0] for bbox in table_bboxes) - REGION_PADDING,
+                min(bbox[1] for bbox in table_bboxes) - REGION_PADDING,
+                max(bbox[2] for bbox in table_bboxes) + REGION_PADDING,
+                max(bbox[3] for bbox in table_bboxes) + REGION_PADDING,
+            ]
+        self._pages[str(page_number)] = region
+
+    def _complete(self, satisfied) -> bool:
+        return len(set(satisfied)) >= len(self.key_matcher.templates)
+
+    def verify(self, satisfied) -> bool:
+        """套用模板的提取是否取得了全部键名，未取得时需回退为完整提取"""
+        return self._complete(satisfied)
+
+    def reset(self):
+        """放弃模板，改为完整提取并重新记录"""
+        self.template = None
+        self._lookup = False
+        self._pages = {}
+
+    def save(self, satisfied):
+        """完整提取结束后保存模板，未取得全部键名时不保存"""
+        if self.template is not None or self.fingerprint is None or not self._complete(satisfied):
+            return
+        self.store.put(self.fingerprint, {
+            'pages': self._pages,
+            'last_page': max((int(page) for page in self._pages), default=0),
+            'keys': sorted(satisfied)
+        })
@@ -2,11 +2,19 @@ import tkinter as tk
 from tkinter import ttk, filedialog
 import os
 import sys  # 确保这行导入存在
+import multiprocessing
+import queue
+import threading
 import pandas as pd
 import re
-from typing import List, Optional, Dict
+from typing import List, Dict
 from pdf_processor import PDFProcessor
 from excel_exporter import ExcelExporter
+from value_postprocess import postprocess_columns, postprocess_record
+from isolated_runner import ProcessingCancelled, write_failure_report
+from append_journal import AppendJournal, append_to_excel
+from project_grouping import export_records, project_rows, project_values
+from file_scanner import FolderManifest, parse_keywords, scan_pdf_files
 from config_manager import ConfigManager
 from datetime import datetime
 
@@ -18,6 +26,8 @@ else:
 
 # 版本信息
 VERSION = "1.0版 (2025年3月)"
+# 界面读取后台处理进度的间隔（毫秒）
+POLL_INTERVAL_MS = 100
 
 class PDFExtractorGUI:
     def __init__(self):
@@ -171,6 +181,14 @@ class PDFExtractorGUI:
                                       width=15,
                                       state='disabled')
         self.append_button.pack(side="right", padx=10)
+
+        # 写入按钮：追加日志中有待写入的行时可用
+        self.flush_button = ttk.Button(excel_options_frame, text="写入Excel", 
+                                     command=self.flush_journal,
+                                     width=12,
+                                     state='disabled')
+        self.flush_button.pack(side="right", padx=10)
+        self.journal_excel = None
         
         # 创建底部框架
         bottom_frame = ttk.Frame(main_frame)
@@ -202,6 +220,18 @@ class PDFExtractorGUI:
                                        width=20)  # 增大按钮宽度
         self.process_button.pack(side="right", padx=10)
         
+        # 取消按钮：只在后台处理进行时可用
+        self.cancel_button = ttk.Button(button_frame, text="取消", 
+                                      command=self.cancel_processing,
+                                      width=10,
+                                      state='disabled')
+        self.cancel_button.pack(side="right", padx=10)
+        
+        # 后台处理线程通过队列向界面报告进度，界面定时读取
+        self._events = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._busy = False
+        
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
     def on_closing(self):
@@ -216,9 +246,29 @@ class PDFExtractorGUI:
             'last_save_folder': self.config.get('last_save_folder', ''),
             'window_position': self.config.get('window_position'),
             'window_size': self.config.get('window_size'),
-            'project_mode': self.project_mode.get()  # 添加项目处理方式的保存
+            'project_mode': self.project_mode.get(),  # 添加项目处理方式的保存
+            'max_workers': self.config.get('max_workers', 0),
+            'use_cache': self.config.get('use_cache', True),
+            'cache_mode': self.config.get('cache_mode', 'use'),
+            'cache_max_mb': self.config.get('cache_max_mb', 512),
+            'stop_when_complete': self.config.get('stop_when_complete', False),
+            'max_pages': self.config.get('max_pages', 0),
+            'page_prefilter': self.config.get('page_prefilter', False),
+            'memory_limit_mb': self.config.get('memory_limit_mb', 0),
+            'memory_policy': self.config.get('memory_policy', 'downgrade'),
+            'pdf_backend': self.config.get('pdf_backend', 'pdfplumber'),
+            'file_timeout': self.config.get('file_timeout', 300),
+            'worker_memory_mb': self.config.get('worker_memory_mb', 0),
+            'use_layout_templates': self.config.get('use_layout_templates', False),
+            'collect_stats': self.config.get('collect_stats', False),
+            'use_scan_manifest': self.config.get('use_scan_manifest', True),
+            'watch_poll_seconds': self.config.get('watch_poll_seconds', 30),
+            'watch_batch_seconds': self.config.get('watch_batch_seconds', 300),
+            'use_append_journal': self.config.get('use_append_journal', False)
         }
         self.config_manager.save_config(config)
+        # 关闭窗口时停止仍在进行的后台处理
+        self._cancel_event.set()
         self.root.destroy()
         
     def select_files(self):
@@ -241,22 +291,20 @@ class PDFExtractorGUI:
             **kwargs
         )
         if folder:
-            self.files = []
-            keywords = [k.strip() for k in self.filter_var.get().split(',') if k.strip()]
-            
-            def process_folder(folder_path, is_root=True):
-                folder_files = []
-                for item in os.listdir(folder_path):
-                    full_path = os.path.join(folder_path, item)
-                    if os.path.isfile(full_path) and full_path.lower().endswith('.pdf'):
-                        if not keywords or any(k in item for k in keywords):
-                            folder_files.append(full_path)
-                    elif os.path.isdir(full_path) and self.subfolder_var.get():
-                        sub_files = process_folder(full_path, False)
-                        folder_files.extend(sub_files)
-                return folder_files
-
-            self.files = process_folder(folder)
+            keywords = parse_keywords(self.filter_var.get())
+            manifest_path = self.config_manager.scan_manifest_path(self.config, folder)
+            if manifest_path:
+                # 使用扫描清单，只重新读取有变化的子文件夹，并报告新增和修改的文件
+                manifest = FolderManifest(folder, manifest_path)
+                first_scan = not manifest.dirs
+                changes = manifest.scan(keywords, self.subfolder_var.get())
+                self.files = changes['files']
+                if not first_scan:
+                    self.status_var.set(
+                        f"自上次选择以来新增 {len(changes['new'])} 个PDF，修改 {len(changes['modified'])} 个，"
+                        f"删除 {len(changes['removed'])} 个")
+            else:
+                self.files = scan_pdf_files(folder, keywords, self.subfolder_var.get())
             self._update_file_label()
             self.config['last_folder'] = folder
             self.config_manager.save_config(self.config)
@@ -311,6 +359,7 @@ class PDFExtractorGUI:
                 
                 # 存储Excel文件信息，但不立即读取标题行
                 self.excel_file = excel_file
+                self._update_flush_button(excel_file)
                 
                 # 提示用户选择工作表和标题行
                 self.status_var.set(f"已选择Excel文件: {os.path.basename(excel_file)}，请选择工作表和标题行")
@@ -352,8 +401,8 @@ class PDFExtractorGUI:
                 self.existing_excel = None
                 return
                 
-            # 读取指定工作表和标题行
-            df = pd.read_excel(self.excel_file, header=header_row, sheet_name=sheet_name)
+            # 读取指定工作表和标题行，追加日志中待写入的行一并计入
+            df = AppendJournal(self.excel_file, sheet_name, header_row).read_dataframe()
             
             # 检查标题行是否有内容
             if df.columns.empty or all(str(col).strip() == '' for col in df.columns):
@@ -369,7 +418,8 @@ class PDFExtractorGUI:
                 'sheet_name': sheet_name
             }
             
-            self.status_var.set(f"已选择Excel文件: {os.path.basename(self.excel_file)} (工作表: {sheet_name}，标题行: {header_row + 1})")
+            self.status_var.set(f"已选择Excel文件: {os.path.basename(self.excel_file)} "
+                                f"(工作表: {sheet_name}，标题行: {header_row + 1}，共 {len(df)} 行数据)")
             self.append_button.config(state='normal')
             
         except Exception as e:
@@ -394,173 +444,86 @@ class PDFExtractorGUI:
             # 读取键名文件
             with open(self.key_file, 'r', encoding='utf-8') as f:
                 key_names = [line.strip() for line in f if line.strip()]
-                
-            processor = PDFProcessor(
-                read_order=self.read_order.get(),
-                allow_empty=self.allow_empty.get(),
-                custom_keys=key_names
-            )
-            
-            # 计算总文件数用于进度显示
-            total_files = len(self.files)
-            processed_count = 0
-            self.progress_var.set(0)  # 重置进度条
+            processor = self._create_processor(key_names)
+        except Exception as e:
+            self.status_var.set(f"处理出错: {str(e)}")
+            return
+        
+        files = list(self.files)
+        project_mode = self.project_mode.get()
+        existing_excel = self.existing_excel
+        use_journal = self.config.get('use_append_journal', False)
+
+        def work():
+            """在后台线程中提取并追加，返回完成后的状态信息"""
+            # 多进程批量提取，结果按文件顺序返回
+            file_results = self._process_all_files(processor, files, "处理文件出错: {error}")
             
-            # 按文件夹组织文件
-            folder_files = {}
-            for file in self.files:
-                folder = os.path.dirname(file)
-                if folder not in folder_files:
-                    folder_files[folder] = []
-                folder_files[folder].append(file)
-
-            combined_folder_results = {}
-            all_results = []
-            skipped_folders = []
-
-            for folder, files in folder_files.items():
-                folder_results = {}
-                
-                for file in files:
-                    self.status_var.set(f"正在处理: {os.path.basename(file)} ({processed_count + 1}/{total_files})")
-                    
-                    try:
-                        results = processor.process_pdf(file)
-                        if results:
-                            for item in results:
-                                # 优先使用新的非空值
-                                if item['key'] not in folder_results or (
-                                    item['value'].strip() and not folder_results[item['key']]['value'].strip()):
-                                    folder_results[item['key']] = item
-                        
-                    except Exception as e:
-                        self.status_var.set(f"处理文件出错: {str(e)}")
-                    
-                    processed_count += 1
-                    # 更新进度条
-                    progress = (processed_count / total_files) * 100
-                    self.progress_var.set(progress)
-                    self.root.update()
-
-                # 检查采购项目名称是否为空
-                has_project_name = False
-                for key, item in folder_results.items():
-                    if '采购项目名称' in key and item['value'].strip():
-                        has_project_name = True
-                        break
-                
-                if not has_project_name:
-                    skipped_folders.append(os.path.basename(folder))
-                    continue
-
-                # 根据项目处理模式决定如何处理结果
-                if self.project_mode.get() == "same":
-                    # 合并到总结果中
-                    for key, item in folder_results.items():
-                        if key not in combined_folder_results or (
-                            item['value'].strip() and not combined_folder_results[key]['value'].strip()):
-                            combined_folder_results[key] = item
-                else:
-                    # 每个文件夹作为独立项目
-                    row_data = {col: '' for col in self.existing_excel['columns']}
-                    
-                    # 将文件夹结果转换为Excel行
-                    for item in folder_results.values():
-                        matching_col = self._find_matching_column(item['key'], self.existing_excel['columns'])
-                        if matching_col:
-                            row_data[matching_col] = item['value']
-                    
-                    all_results.append(row_data)
-
-            # 如果是合并模式，添加合并后的结果
-            if self.project_mode.get() == "same" and combined_folder_results:
-                # 检查合并模式下采购项目名称是否为空
-                has_project_name = False
-                for key, item in combined_folder_results.items():
-                    if '采购项目名称' in key and item['value'].strip():
-                        has_project_name = True
-                        break
-                
-                if has_project_name:
-                    row_data = {col: '' for col in self.existing_excel['columns']}
-                    
-                    # 将合并结果转换为Excel行
-                    for item in combined_folder_results.values():
-                        matching_col = self._find_matching_column(item['key'], self.existing_excel['columns'])
-                        if matching_col:
-                            row_data[matching_col] = item['value']
-                    
-                    all_results.append(row_data)
+            # 按文件夹汇总为项目，采购项目名称为空的文件夹被跳过
+            projects, skipped_folders = project_values(files, file_results, project_mode)
 
-            if all_results:
-                # 追加到现有Excel
+            # 将项目结果转换为Excel行，键名按列名严格匹配
+            all_results = project_rows(projects, existing_excel['columns'])
+
+            if not all_results:
+                if skipped_folders:
+                    return f"未找到可提取的内容。所有文件夹({len(skipped_folders)}个)的采购项目名称都为空。"
+                return self._with_failure_note("未找到可提取的内容")
+
+            # 批量处理价格和时间列，以数值和日期写入
+            rows = postprocess_columns(pd.DataFrame(all_results))
+            if use_journal:
+                # 只记入追加日志，不保存工作簿
                 try:
-                    exporter = ExcelExporter()
-                    # 将工作表信息传递给exporter
-                    exporter.export_to_excel(
-                        all_results, 
-                        self.existing_excel['file'],
-                        existing_excel=self.existing_excel,
-                        append_mode=True,
-                        sheet_name=self.existing_excel.get('sheet_name')
-                    )
-                    if skipped_folders:
-                        self.status_var.set(f"已成功新增数据到Excel。跳过了{len(skipped_folders)}个文件夹，因为采购项目名称为空。")
-                    else:
-                        self.status_var.set("已成功新增数据到Excel")
+                    journal = AppendJournal(existing_excel['file'], existing_excel.get('sheet_name'),
+                                            existing_excel['header_row'])
+                    journal.append(rows)
                 except Exception as e:
-                    self.status_var.set(f"保存Excel时出错: {str(e)}")
-            else:
-                if skipped_folders:
-                    self.status_var.set(f"未找到可提取的内容。所有文件夹({len(skipped_folders)}个)的采购项目名称都为空。")
-                else:
-                    self.status_var.set("未找到可提取的内容")
+                    return f"记录追加日志时出错: {str(e)}"
+                return self._with_failure_note(
+                    f"已记录 {len(rows)} 行到追加日志（共 {journal.pending} 行待写入），点击【写入Excel】保存到工作簿")
 
+            # 追加到现有Excel
+            self._events.put(('status', "正在保存Excel..."))
+            try:
+                append_to_excel(rows, existing_excel)
+            except Exception as e:
+                return f"保存Excel时出错: {str(e)}"
+            if skipped_folders:
+                return self._with_failure_note(
+                    f"已成功新增数据到Excel。跳过了{len(skipped_folders)}个文件夹，因为采购项目名称为空。")
+            return self._with_failure_note("已成功新增数据到Excel")
+
+        def finish():
             # 清除Excel选择
             self.existing_excel = None
             self.append_button.config(state='disabled')
             self.process_button.config(state='normal')
-            # 完成后确保进度条显示100%
-            self.progress_var.set(100)
-            self.root.update()
-            
-        except Exception as e:
-            self.status_var.set(f"处理出错: {str(e)}")
-        finally:
-            # 清理工作
-            self.existing_excel = None
-            self.append_button.config(state='disabled')
-            self.process_button.config(state='normal')
-            # 延迟重置进度条
-            self.root.after(1000, lambda: self.progress_var.set(0))
+            self._update_flush_button(existing_excel['file'])
 
-    def _find_matching_column(self, key: str, columns: List[str]) -> Optional[str]:
-        """查找与键名严格匹配的列名"""
-        if key is None:
-            return None
-            
-        # 确保key是字符串类型
-        key = str(key) if key is not None else ""
-        key = self._normalize_text(key)
-        
-        # 首先尝试完全匹配
-        for col in columns:
-            col_str = str(col) if col is not None else ""
-            if self._normalize_text(col_str) == key:
-                return col
-                
-        # 对于时间相关的键，需要特殊处理
-        if '时间' in key:
-            # 完全匹配所有可能的键名
-            for col in columns:
-                col_str = str(col) if col is not None else ""
-                col_norm = self._normalize_text(col_str)
-                # 只有当键名完全包含在列名中时才匹配
-                if key == col_norm:
-                    # 验证值是否符合时间格式
-                    return col
-                    
-        return None
+        self._start_job(work, self.status_var.set, finish)
+
+    def _update_flush_button(self, excel_file: str):
+        """Excel的追加日志中有待写入的行时启用写入按钮"""
+        try:
+            pending = AppendJournal(excel_file).pending
+        except Exception:
+            pending = 0
+        self.journal_excel = excel_file if pending else None
+        self.flush_button.config(state='normal' if pending else 'disabled')
+
+    def flush_journal(self):
+        """把追加日志中的全部待写入行一次写入Excel"""
+        excel_file = self.journal_excel
+        if not excel_file:
+            return
+
+        def work():
+            self._events.put(('status', "正在保存Excel..."))
+            count = AppendJournal(excel_file).flush()
+            return f"已将 {count} 行写入 {os.path.basename(excel_file)}"
+
+        self._start_job(work, self.status_var.set, lambda: self._update_flush_button(excel_file))
 
     def _is_valid_time_format(self, value: str) -> bool:
         """验证是否为有效的时间格式"""
@@ -582,120 +545,223 @@ class PDFExtractorGUI:
         
         return any(re.match(pattern, value) for pattern in patterns)
 
-    def _normalize_text(self, text: str) -> str:
-        """标准化文本，移除所有空白字符但保留基本文本"""
-        if not text:
-            return ""
-        # 移除所有空白字符
-        text = re.sub(r'\s+', '', text)
-        # 移除中英文冒号和括号
-        text = text.rstrip('：:')
-        # 统一括号格式
-        text = text.replace('（', '(').replace('）', ')')
-        # 移除可能的括号内容
-        text = re.sub(r'\([^)]*\)', '', text)
-        # 转换为小写
-        return text.lower()
+    def _create_processor(self, key_names: List[str]) -> PDFProcessor:
+        """根据当前界面选项和配置创建PDF处理器"""
+        return PDFProcessor(
+            read_order=self.read_order.get(),
+            allow_empty=self.allow_empty.get(),
+            custom_keys=key_names,
+            **self.config_manager.processor_options(self.config)
+        )
+
+    def _process_all_files(self, processor: PDFProcessor, files: List[str], error_message: str) -> Dict:
+        """在后台线程中使用进程池处理所有文件，返回 文件路径 -> 提取结果（或异常）的映射
+
+        进度通过事件队列报告给界面；点击取消后抛出 ProcessingCancelled。
+        """
+        total_files = len(files)
+        processed_count = 0
+        self._events.put(('progress', 0))  # 重置进度条
+        self._events.put(('status', f"正在处理 {total_files} 个文件..."))
+
+        def on_progress(file_path, result):
+            nonlocal processed_count
+            processed_count += 1
+            if isinstance(result, Exception):
+                self._events.put(('status', error_message.format(
+                    name=os.path.basename(file_path), error=str(result))))
+            else:
+                self._events.put(('status', f"已处理: {os.path.basename(file_path)} ({processed_count}/{total_files})"))
+            # 更新进度条
+            self._events.put(('progress', (processed_count / total_files) * 100))
+
+        results = processor.process_many(
+            files,
+            workers=self.config.get('max_workers', 0),
+            progress_callback=on_progress,
+            timeout=self.config.get('file_timeout', 300),
+            memory_limit_mb=self.config.get('worker_memory_mb', 0),
+            should_cancel=self._cancel_event.is_set
+        )
+
+        # 记录失败和降级处理的文件及原因，便于事后单独排查
+        self.failure_count = len(processor.failures)
+        self.degraded_count = len(processor.degraded_files)
+        report = processor.failures + [
+            {'file': file_path, 'reason': 'degraded', 'message': "超出内存上限后剩余页面未做表格识别，结果可能不完整"}
+            for file_path in processor.degraded_files
+        ]
+        if report:
+            report_file = os.path.join(self.config_manager.config_dir, '失败报告.csv')
+            try:
+                write_failure_report(report, report_file)
+            except Exception as e:
+                print(f"写入失败报告出错: {str(e)}")
+        return dict(zip(files, results))
+
+    def _start_job(self, work, on_done, on_finish=None):
+        """在后台线程中运行 work()，完成后在界面线程中调用 on_done(返回值)
+
+        on_finish 在完成、出错或取消后都会在界面线程中调用。
+        界面不等待后台线程，而是每隔 POLL_INTERVAL_MS 毫秒读取一次事件队列。
+        """
+        self._cancel_event.clear()
+        self._set_busy(True)
+
+        def run():
+            try:
+                result = work()
+            except ProcessingCancelled:
+                self._events.put(('cancelled', None))
+            except Exception as e:
+                self._events.put(('error', str(e)))
+            else:
+                self._events.put(('done', result))
+
+        self._job_callbacks = (on_done, on_finish)
+        threading.Thread(target=run, daemon=True).start()
+        self.root.after(POLL_INTERVAL_MS, self._poll_events)
+
+    def _poll_events(self):
+        """读取后台线程报告的全部事件并更新界面，任务未结束时继续定时读取"""
+        finished = None
+        while True:
+            try:
+                kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'status':
+                self.status_var.set(payload)
+            elif kind == 'progress':
+                self.progress_var.set(payload)
+            else:
+                finished = (kind, payload)
+
+        if finished is None:
+            self.root.after(POLL_INTERVAL_MS, self._poll_events)
+            return
+
+        kind, payload = finished
+        on_done, on_finish = self._job_callbacks
+        self._set_busy(False)
+        if on_finish:
+            on_finish()
+        if kind == 'done':
+            # 完成后确保进度条显示100%
+            self.progress_var.set(100)
+            try:
+                on_done(payload)
+            except Exception as e:
+                self.status_var.set(f"处理出错: {str(e)}")
+        elif kind == 'cancelled':
+            self.status_var.set("已取消处理")
+        else:
+            self.status_var.set(f"处理出错: {payload}")
+        # 延迟重置进度条（期间开始了新的后台任务时不重置）
+        self.root.after(1000, lambda: self._busy or self.progress_var.set(0))
+
+    def _set_busy(self, busy: bool):
+        """后台处理期间禁用处理按钮并启用取消按钮，结束后恢复处理按钮原来的状态"""
+        self._busy = busy
+        if busy:
+            self._button_states = (self.process_button.cget('state'), self.append_button.cget('state'),
+                                   self.flush_button.cget('state'))
+            self.process_button.config(state='disabled')
+            self.append_button.config(state='disabled')
+            self.flush_button.config(state='disabled')
+            self.cancel_button.config(state='normal')
+        else:
+            process_state, append_state, flush_state = self._button_states
+            self.process_button.config(state=process_state)
+            self.append_button.config(state=append_state)
+            self.flush_button.config(state=flush_state)
+            self.cancel_button.config(state='disabled')
+
+    def cancel_processing(self):
+        """请求取消当前的后台处理，处理在当前文件（单进程时为当前页）完成后停止"""
+        self._cancel_event.set()
+        self.cancel_button.config(state='disabled')
+        self.status_var.set("正在取消...")
+
+    def _with_failure_note(self, message: str) -> str:
+        """在状态信息后附加失败和降级处理的文件数量"""
+        notes = []
+        failure_count = getattr(self, 'failure_count', 0)
+        if failure_count:
+            notes.append(f"{failure_count} 个文件处理失败")
+        degraded_count = getattr(self, 'degraded_count', 0)
+        if degraded_count:
+            notes.append(f"{degraded_count} 个文件因内存超限降级处理")
+        if notes:
+            return f"{message}（{'，'.join(notes)}，详见失败报告.csv）"
+        return message
+
+    def _with_stats_note(self, processor: PDFProcessor, message: str) -> str:
+        """启用分阶段统计时，在状态信息后附加一行各阶段用时"""
+        if processor.stats.enabled:
+            return f"{message} {processor.stats.summary()}"
+        return message
 
     def process_files(self):
-        try:
-            if not self.files:
-                self.status_var.set("请先选择PDF文件")
-                return
+        if not self.files:
+            self.status_var.set("请先选择PDF文件")
+            return
+        
+        if not self.key_file:
+            self.status_var.set("请先选择键名文件")
+            return
             
-            if not self.key_file:
-                self.status_var.set("请先选择键名文件")
-                return
-                
+        try:
             # 读取键名文件
             key_names = []
             if self.key_file and os.path.exists(self.key_file):
                 with open(self.key_file, 'r', encoding='utf-8') as f:
                     key_names = [line.strip() for line in f if line.strip()]
                     
-            processor = PDFProcessor(
-                read_order=self.read_order.get(),
-                allow_empty=self.allow_empty.get(),
-                custom_keys=key_names
-            )
-            results = []
-            total_files = len(self.files)
-            processed_count = 0
-            self.progress_var.set(0)  # 重置进度条
-            
-            # 按文件夹组织文件
-            folder_files = {}
-            for file in self.files:
-                folder = os.path.dirname(file)
-                if folder not in folder_files:
-                    folder_files[folder] = []
-                folder_files[folder].append(file)
-
-            current_count = 0
-            for folder, files in folder_files.items():
-                folder_results = []
-                for file in files:
-                    self.status_var.set(f"正在处理: {os.path.basename(file)} ({processed_count + 1}/{total_files})")
-                    
-                    try:
-                        result = processor.process_pdf(file)
-                        if result:
-                            for item in result:
-                                item['filename'] = os.path.basename(file)
-                                item['folder'] = os.path.basename(folder)
-                            folder_results.extend(result)
-                    except Exception as e:
-                        self.status_var.set(f"处理文件 {os.path.basename(file)} 时出错: {str(e)}")
-                    processed_count += 1
-                    # 更新进度条
-                    progress = (processed_count / total_files) * 100
-                    self.progress_var.set(progress)
-                    self.root.update()
-
-                # 根据项目处理模式决定是否合并结果
-                if self.project_mode.get() == "same" and folder_results:
-                    # 只保留每个键的第一个值
-                    unique_results = {}
-                    for item in folder_results:
-                        if item['key'] not in unique_results:
-                            unique_results[item['key']] = item
-                    folder_results = list(unique_results.values())
-                
-                results.extend(folder_results)
-
-            # 更新最终状态
-            if results:
-                kwargs = self.config_manager.get_file_dialog_kwargs('save')
-                output_file = filedialog.asksaveasfilename(
-                    defaultextension=".xlsx",
-                    filetypes=[("Excel文件", "*.xlsx")],
-                    title="保存Excel文件",
-                    **kwargs
-                )
-                if output_file:
-                    self.config['last_save_folder'] = os.path.dirname(output_file)
-                    self.config_manager.save_config(self.config)
-                    exporter = ExcelExporter()
-                    exporter.export_to_excel(
-                        results, 
-                        output_file,
-                        existing_excel=getattr(self, 'existing_excel', None),
-                        append_mode=False  # 不传递 append_mode 参数
-                    )
-                    self.status_var.set("导出完成！")
-            else:
-                self.status_var.set("未找到可提取的内容")
-            
-            # 完成后确保进度条显示100%
-            self.progress_var.set(100)
-            self.root.update()
-
+            processor = self._create_processor(key_names)
         except Exception as e:
             self.status_var.set(f"处理出错: {str(e)}")
-        finally:
-            # 延迟重置进度条
-            self.root.after(1000, lambda: self.progress_var.set(0))
+            return
+        
+        files = list(self.files)
+        project_mode = self.project_mode.get()
+
+        def work():
+            # 多进程批量提取，结果按文件顺序返回
+            file_results = self._process_all_files(processor, files, "处理文件 {name} 时出错: {error}")
+            # 按文件夹组织结果
+            return export_records(files, file_results, project_mode)
+
+        def export(results):
+            """提取完成后在界面线程中选择保存位置，再在后台线程中写入Excel"""
+            if not results:
+                self.status_var.set(self._with_stats_note(processor, self._with_failure_note("未找到可提取的内容")))
+                return
+            kwargs = self.config_manager.get_file_dialog_kwargs('save')
+            output_file = filedialog.asksaveasfilename(
+                defaultextension=".xlsx",
+                filetypes=[("Excel文件", "*.xlsx")],
+                title="保存Excel文件",
+                **kwargs
+            )
+            if not output_file:
+                return
+            self.config['last_save_folder'] = os.path.dirname(output_file)
+            self.config_manager.save_config(self.config)
+
+            def write():
+                self._events.put(('status', "正在保存Excel..."))
+                exporter = ExcelExporter()
+                # 逐条处理价格和时间值，以数值和日期流式写入
+                exporter.stream_to_excel(map(postprocess_record, results), output_file)
+                return self._with_stats_note(processor, self._with_failure_note("导出完成！"))
+
+            self._start_job(write, self.status_var.set)
+
+        self._start_job(work, export)
 
 if __name__ == "__main__":
+    # 打包为可执行文件时，多进程处理需要此调用
+    multiprocessing.freeze_support()
     app = PDFExtractorGUI()
     app.root.mainloop()
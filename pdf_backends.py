@@ -0,0 +1,231 @@
+import pdfplumber
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import List, Dict, Optional, Iterator
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LTChar, LTContainer
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+from pdfplumber.page import Page
+
+
+def _extract_words(chars: List[Dict]) -> List[Dict]:
+    """与 page.extract_words 相同参数的词流，大幅增大x容差以保留单元格内的大空格分隔"""
+    return pdfplumber.utils.extract_words(
+        chars, keep_blank_chars=True, x_tolerance=15, y_tolerance=5)
+
+
+def document_page_count(document: PDFDocument) -> int:
+    """从已打开文档的目录读取页数，不创建页面对象，无法读取时返回0"""
+    try:
+        return int(resolve1(resolve1(document.catalog['Pages'])['Count']))
+    except Exception:
+        return 0
+
+
+def count_pages(file_path: str) -> int:
+    """从文档目录读取页数，不解析页面内容，无法读取时返回0"""
+    try:
+        with open(file_path, 'rb') as f:
+            return document_page_count(PDFDocument(PDFParser(f)))
+    except Exception:
+        return 0
+
+
+def _iter_chars(container) -> Iterator[LTChar]:
+    """按内容流顺序遍历版面对象中的全部字符"""
+    for obj in container:
+        if isinstance(obj, LTChar):
+            yield obj
+        elif isinstance(obj, LTContainer):
+            yield from _iter_chars(obj)
+
+
+class PageContext:
+    """单页提取上下文：字符只取一次，表格网格、词流和预筛选文本都由同一份字符派生
+
+    所有后端的页面都提供 page_number、table_bboxes、text()、words()、extract_tables() 和 close()。
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.page_number = page.page_number
+        self._chars = None
+        self._words = None
+        self._v_order = None
+        self.table_bboxes = []  # 最近一次 extract_tables 识别到的表格区域，与表格一一对应
+
+    @property
+    def chars(self) -> List[Dict]:
+        """页面字符，首次访问时才解析页面内容"""
+        if self._chars is None:
+            self._chars = self.page.chars
+        return self._chars
+
+    def _build_index(self):
+        # 字符中心点及按纵向中心排序的索引，用于按区域快速取字符
+        chars = self.chars
+        self._h_mids = [(char['x0'] + char['x1']) / 2 for char in chars]
+        self._v_mids = [(char['top'] + char['bottom']) / 2 for char in chars]
+        self._v_order = sorted(range(len(chars)), key=self._v_mids.__getitem__)
+        self._v_sorted = [self._v_mids[idx] for idx in self._v_order]
+
+    def text(self) -> str:
+        """页面全部字符按内容流顺序拼接"""
+        return ''.join(char['text'] for char in self.chars)
+
+    def words(self) -> List[Dict]:
+        if self._words is None:
+            self._words = _extract_words(self.chars)
+        return self._words
+
+    def _char_indices_in_bbox(self, bbox, candidates=None) -> List[int]:
+        """中心点落在区域内的字符下标，保持原始字符顺序"""
+        if self._v_order is None:
+            self._build_index()
+        x0, top, x1, bottom = bbox
+        if candidates is None:
+            start = bisect_left(self._v_sorted, top)
+            end = bisect_left(self._v_sorted, bottom)
+            candidates = sorted(self._v_order[start:end])
+        h_mids, v_mids = self._h_mids, self._v_mids
+        return [idx for idx in candidates
+                if x0 <= h_mids[idx] < x1 and top <= v_mids[idx] < bottom]
+
+    def extract_tables(self) -> List[List[List[Optional[str]]]]:
+        """识别表格并从共享字符中取出单元格文本，结果与 page.extract_tables 一致"""
+        tables = []
+        found = self.page.find_tables()
+        self.table_bboxes = [table.bbox for table in found]
+        for table in found:
+            grid = []
+            for row in table.rows:
+                row_indices = self._char_indices_in_bbox(row.bbox)
+                cells = []
+                for cell in row.cells:
+                    if cell is None:
+                        cells.append(None)
+                        continue
+                    cell_chars = [self.chars[idx] for idx in self._char_indices_in_bbox(cell, row_indices)]
+                    cells.append(pdfplumber.utils.extract_text(cell_chars) if cell_chars else "")
+                grid.append(cells)
+            tables.append(grid)
+        return tables
+
+    def crop(self, bbox) -> Optional['PageContext']:
+        """裁剪到指定区域的页面上下文，超出页面的部分被截去，与页面不相交时返回None"""
+        page_x0, page_top, page_x1, page_bottom = self.page.bbox
+        x0, top = max(bbox[0], page_x0), max(bbox[1], page_top)
+        x1, bottom = min(bbox[2], page_x1), min(bbox[3], page_bottom)
+        if x0 >= x1 or top >= bottom:
+            return None
+        return PageContext(self.page.crop((x0, top, x1, bottom)))
+
+    def close(self):
+        """释放该页的版面缓存"""
+        self.page.close()
+
+
+class MinerPageContext:
+    """轻量页面：直接由 pdfminer 的字符对象构造，不识别表格"""
+
+    def __init__(self, layout, page_number: int, initial_doctop: float = 0):
+        self.page_number = page_number
+        page_top = layout.y1
+        self.chars = [
+            {
+                'text': char.get_text(),
+                'x0': char.x0,
+                'x1': char.x1,
+                'top': page_top - char.y1,
+                'bottom': page_top - char.y0,
+                'doctop': initial_doctop + page_top - char.y1,
+                'upright': char.upright,
+                'size': char.size,
+            }
+            for char in _iter_chars(layout)
+        ]
+        self._words = None
+        self.table_bboxes = []
+
+    def text(self) -> str:
+        return ''.join(char['text'] for char in self.chars)
+
+    def words(self) -> List[Dict]:
+        if self._words is None:
+            self._words = _extract_words(self.chars)
+        return self._words
+
+    def extract_tables(self) -> List[List[List[Optional[str]]]]:
+        return []
+
+    def close(self):
+        self.chars = []
+        self._words = None
+
+
+class PDFBackend(ABC):
+    """PDF解析后端接口：逐页产出提供表格和带坐标词流的页面对象"""
+
+    name = ''
+    supports_crop = False  # 页面对象是否支持按区域裁剪（版面模板依赖此能力）
+
+    @abstractmethod
+    def iter_pages(self, file_path: str) -> Iterator:
+        """打开文档并逐页产出页面对象，迭代结束或中止时关闭文档"""
+
+
+class PlumberBackend(PDFBackend):
+    """默认后端：完整的 pdfplumber 对象模型，支持表格识别"""
+
+    name = 'pdfplumber'
+    supports_crop = True
+
+    def iter_pages(self, file_path: str) -> Iterator[PageContext]:
+        with pdfplumber.open(file_path) as pdf:
+            # 逐页创建页面对象；与 pdf.pages 不同，处理完的页面不会保留到文档关闭
+            doctop = 0
+            for page_number, page_obj in enumerate(PDFPage.create_pages(pdf.doc), 1):
+                page = Page(pdf, page_obj, page_number=page_number, initial_doctop=doctop)
+                doctop += page.height
+                yield PageContext(page)
+
+
+class PdfminerBackend(PDFBackend):
+    """轻量后端：直接驱动 pdfminer 收集字符，不做版面分析和表格识别
+
+    适用于"键：值"形式的公告类文档，以准确度换取吞吐量。
+    """
+
+    name = 'pdfminer'
+
+    def iter_pages(self, file_path: str) -> Iterator[MinerPageContext]:
+        with open(file_path, 'rb') as f:
+            document = PDFDocument(PDFParser(f))
+            resource_manager = PDFResourceManager()
+            # laparams=None 时不进行版面分析，只收集字符对象
+            device = PDFPageAggregator(resource_manager, laparams=None)
+            interpreter = PDFPageInterpreter(resource_manager, device)
+            doctop = 0
+            for page_number, page_obj in enumerate(PDFPage.create_pages(document), 1):
+                interpreter.process_page(page_obj)
+                layout = device.get_result()
+                yield MinerPageContext(layout, page_number, doctop)
+                doctop += layout.height
+
+
+BACKENDS = {
+    PlumberBackend.name: PlumberBackend,
+    PdfminerBackend.name: PdfminerBackend,
+}
+
+
+def get_backend(name: str) -> PDFBackend:
+    """按名称创建解析后端"""
+    backend_class = BACKENDS.get(name or PlumberBackend.name)
+    if backend_class is None:
+        raise ValueError(f"未知的PDF解析后端: {name}，可选: {', '.join(BACKENDS)}")
+    return backend_class()
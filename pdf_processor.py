@@ -1,11 +1,186 @@
-import pdfplumber
+import gc
+import os
 import re
-from typing import List, Dict
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from bisect import insort
+from functools import lru_cache
+from typing import List, Dict, Optional, Callable, Union, Iterator, Tuple
+from extraction_stats import ExtractionStats, NullStats, attach_stats
+from isolated_runner import IsolatedRunner, FileProcessingError, ProcessingCancelled, process_rss_mb
+from key_matcher import KeyMatcher
+from layout_templates import LayoutTemplateStore, LayoutSession
+from pdf_backends import PageContext, get_backend
+from result_cache import ResultCache
+
+# 工作进程内的处理器实例，由 _init_worker 在每个进程启动时创建一次
+_worker_processor = None
+
+
+def _init_worker(config: Dict):
+    """进程池初始化函数：每个工作进程只接收一次键名配置"""
+    global _worker_processor
+    _worker_processor = PDFProcessor(**config)
+
+
+def _process_in_worker(file_path: str):
+    """在工作进程中处理单个文件，出错时返回异常对象而不是抛出"""
+    try:
+        result = _worker_processor.process_pdf(file_path)
+    except Exception as e:
+        result = e
+    # 启用分阶段统计时，文档统计随结果返回主进程
+    if _worker_processor.stats.enabled:
+        result = attach_stats(result, _worker_processor.stats.pop_document(file_path))
+    return result
+
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=8192)
+def _normalize_cached(text: str) -> str:
+    """带缓存的文本标准化，采购表单中大量重复的标签只计算一次"""
+    # 保留括号内的内容，只处理空白字符
+    text = _WHITESPACE_PATTERN.sub('', text)
+    # 移除中英文冒号
+    text = text.rstrip('：:')
+    # 替换全角字符为半角字符
+    text = text.replace('（', '(').replace('）', ')')
+    return text.lower()
+
+
+def _normalize_key(text: str) -> str:
+    if not text or not isinstance(text, str):
+        return ""
+    return _normalize_cached(text)
+
+
+class _ResultIndex:
+    """按标准化键名分组的原始结果索引，用于去重时按模板快速选出最佳结果"""
+
+    def __init__(self, key_matcher: KeyMatcher):
+        self.key_matcher = key_matcher
+        self.results: Dict[int, Dict] = {}  # 结果位置 -> 结果，位置按输入顺序递增
+        self._next = 0
+        self._keys: Dict[int, str] = {}  # 每条结果当前的标准化键名
+        self._groups: Dict[str, List[int]] = {}  # 标准化键名 -> 结果位置（升序）
+        self._filled: Dict[str, int] = {}  # 标准化键名 -> 输入时有值的结果数
+        self._summary: Dict[str, tuple] = {}  # 标准化键名 -> (第一条位置, 第一条有值的位置)
+        self._template_groups: Dict[int, set] = {}  # 模板下标 -> 可接受的标准化键名
+
+    def add(self, result: Dict, limit: Optional[int] = None) -> bool:
+        """加入一条结果，返回是否保留
+
+        指定 limit 时每个标准化键名只保留最早的 limit 条结果和最早的 limit 条有值结果：
+        去重时每个模板至多取走一条结果，其余结果不会被任何模板选中。
+        不被任何模板接受的键名也不保留。
+        """
+        key = _normalize_key(result['key'])
+        filled = bool(result['value'].strip())
+        if limit is not None:
+            if not self.key_matcher.result_matches(key):
+                return False
+            group = self._groups.get(key, ())
+            if len(group) >= limit and (not filled or self._filled.get(key, 0) >= limit):
+                return False
+        position = self._next
+        self._next += 1
+        self.results[position] = result
+        self._keys[position] = key
+        if filled:
+            self._filled[key] = self._filled.get(key, 0) + 1
+        self._insert(key, position)
+        return True
+
+    def copy(self) -> '_ResultIndex':
+        """复制索引和其中的结果，去重时在副本上改写键名和值"""
+        clone = _ResultIndex(self.key_matcher)
+        clone.results = {position: dict(result) for position, result in self.results.items()}
+        clone._next = self._next
+        clone._keys = dict(self._keys)
+        clone._groups = {key: list(group) for key, group in self._groups.items()}
+        clone._filled = dict(self._filled)
+        clone._summary = dict(self._summary)
+        clone._template_groups = {idx: set(keys) for idx, keys in self._template_groups.items()}
+        return clone
+
+    def _insert(self, key: str, position: int):
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = []
+            for idx in self.key_matcher.result_matches(key):
+                self._template_groups.setdefault(idx, set()).add(key)
+        insort(group, position)
+        self._summary.pop(key, None)
+
+    def _group_summary(self, key: str) -> tuple:
+        summary = self._summary.get(key)
+        if summary is None:
+            group = self._groups[key]
+            first_filled = next(
+                (pos for pos in group if self.results[pos]['value'].strip()), None)
+            summary = self._summary[key] = (group[0] if group else None, first_filled)
+        return summary
+
+    def best(self, template_idx: int) -> Optional[int]:
+        """模板的最佳结果位置：最早出现的有值结果，否则为最早出现的结果"""
+        first = None
+        first_filled = None
+        for key in self._template_groups.get(template_idx, ()):
+            group_first, group_filled = self._group_summary(key)
+            if group_first is not None and (first is None or group_first < first):
+                first = group_first
+            if group_filled is not None and (first_filled is None or group_filled < first_filled):
+                first_filled = group_filled
+        return first_filled if first_filled is not None else first
+
+    def refresh(self, position: int):
+        """结果的键名或值被改写后更新索引"""
+        old_key = self._keys[position]
+        new_key = _normalize_key(self.results[position]['key'])
+        if new_key != old_key:
+            self._groups[old_key].remove(position)
+            self._keys[position] = new_key
+            self._insert(new_key, position)
+        self._summary.pop(old_key, None)
+
 
 class PDFProcessor:
-    def __init__(self, read_order: str, allow_empty: bool = False, custom_keys: List[str] = None):
+    def __init__(self, read_order: str, allow_empty: bool = False, custom_keys: List[str] = None,
+                 cache_path: Optional[str] = None, cache_mode: str = 'use', cache_max_mb: float = 512,
+                 stop_when_complete: bool = False, max_pages: Optional[int] = None,
+                 page_prefilter: bool = False, memory_limit_mb: Optional[float] = None,
+                 memory_policy: str = 'downgrade', backend: str = 'pdfplumber',
+                 template_path: Optional[str] = None, collect_stats: bool = False):
         self.read_order = read_order
         self.allow_empty = allow_empty
+        # 提前结束：所有键名都已取得非空值后不再解析后续页面；max_pages 限制每个文档最多解析的页数
+        self.stop_when_complete = stop_when_complete
+        self.max_pages = max_pages if max_pages and max_pages > 0 else None
+        # 页面预筛选：页面文字中不含任何键名时跳过表格识别和文本块分组
+        # 表格宽松匹配还接受与键名部分相同的标签（如"项目名称"匹配"工程项目名称"），这类页面会被跳过，因此默认关闭
+        self.page_prefilter = page_prefilter
+        # 内存上限：超出后 'downgrade' 跳过剩余页面的表格识别，'abandon' 放弃该文档
+        self.memory_limit_mb = memory_limit_mb if memory_limit_mb and memory_limit_mb > 0 else None
+        self.memory_policy = memory_policy
+        self.degraded_files = []  # 因内存超限而降级处理的文件，批量处理时包括工作进程中的文件
+        self.failures = []  # 最近一次批量处理中失败的文件及原因
+        self._should_cancel = None  # 批量处理期间的取消检查函数，在页与页之间检查
+        # PDF解析后端：'pdfplumber'（默认，支持表格）或 'pdfminer'（轻量，仅文本块）
+        self.backend_name = backend
+        self.backend = get_backend(backend)
+        # 结果缓存：cache_mode 为 'use'（读写缓存）、'refresh'（忽略已有缓存并重新写入）或 'bypass'（不使用缓存）
+        self.cache_path = cache_path
+        self.cache_mode = cache_mode
+        self.cache_max_mb = cache_max_mb
+        self._cache = ResultCache(cache_path, cache_max_mb) if cache_path and cache_mode != 'bypass' else None
+        # 版面模板：同一版式的文档只解析模板记录的页面和表格区域，仅支持可裁剪页面的后端
+        self.template_path = template_path
+        self._layouts = LayoutTemplateStore(template_path) if template_path and self.backend.supports_crop else None
+        # 分阶段计时和计数，未启用时为空实现；启用预筛选或内存上限时也统计，
+        # 以报告跳过的页数和降级处理的文件（多进程时随结果传回）
+        self.stats = ExtractionStats() if collect_stats or page_prefilter or self.memory_limit_mb else NullStats()
         # 预处理键名：移除空白字符并标准化
         self.custom_keys = []
         self.original_keys = []
@@ -16,18 +191,45 @@ class PDFProcessor:
                     normalized_key = self._normalize_text(key)
                     base_key = normalized_key.replace('(元)', '').replace('（元）', '')
                     self.custom_keys.append(base_key)
+        # 键名匹配索引，构建一次后供表格、文本块和去重流程共用
+        self.key_matcher = KeyMatcher(self.custom_keys)
+
+    def _get_config(self) -> Dict:
+        """返回重建处理器所需的参数，用于传递给工作进程"""
+        return {
+            'read_order': self.read_order,
+            'allow_empty': self.allow_empty,
+            'custom_keys': list(self.original_keys),
+            'cache_path': self.cache_path,
+            'cache_mode': self.cache_mode,
+            'cache_max_mb': self.cache_max_mb,
+            'stop_when_complete': self.stop_when_complete,
+            'max_pages': self.max_pages,
+            'page_prefilter': self.page_prefilter,
+            'memory_limit_mb': self.memory_limit_mb,
+            'memory_policy': self.memory_policy,
+            'backend': self.backend_name,
+            'template_path': self.template_path,
+            'collect_stats': self.stats.enabled
+        }
+
+    def _cache_fingerprint(self) -> str:
+        """影响提取结果的全部选项的指纹"""
+        return ResultCache.make_fingerprint({
+            'read_order': self.read_order,
+            'allow_empty': self.allow_empty,
+            'custom_keys': self.custom_keys,
+            'original_keys': self.original_keys,
+            'stop_when_complete': self.stop_when_complete,
+            'max_pages': self.max_pages,
+            'page_prefilter': self.page_prefilter,
+            'backend': self.backend_name,
+            'layout_templates': self._layouts is not None
+        })
     
     def _normalize_text(self, text: str) -> str:
         """标准化文本，但保留更多原始格式"""
-        if not text or not isinstance(text, str):
-            return ""
-        # 保留括号内的内容，只处理空白字符
-        text = re.sub(r'\s+', '', text)
-        # 移除中英文冒号
-        text = text.rstrip('：:')
-        # 替换全角字符为半角字符
-        text = text.replace('（', '(').replace('）', ')')
-        return text.lower()
+        return _normalize_key(text)
 
     def _normalize_value(self, value: str, key: str = "") -> str:
         """标准化值，处理数字格式，根据键名进行特殊处理"""
@@ -97,8 +299,10 @@ class PDFProcessor:
         if not table or not self.custom_keys:
             return results
         
-        # 清理表格数据，但保留单元格内的空格和格式
+        # 清理表格数据，但保留单元格内的空格和格式；同时生成标准化网格，供两轮匹配共用
         cleaned_table = []
+        normalized_table = []
+        normalize = self._normalize_text
         for row in table:
             if row and any(cell is not None and str(cell).strip() for cell in row):
                 # 处理每个单元格，保留内部格式和间隔
@@ -107,46 +311,42 @@ class PDFProcessor:
                     if cell is None:
                         cleaned_row.append("")
                     else:
-                        # 将单元格内容转换为字符串，保留间隔
-                        cell_str = str(cell)
-                        # 只清理前后空格，保留内部空格和格式
-                        cell_str = cell_str.strip()
-                        cleaned_row.append(cell_str)
+                        # 将单元格内容转换为字符串，只清理前后空格，保留内部空格和格式
+                        cleaned_row.append(str(cell).strip())
                 cleaned_table.append(cleaned_row)
+                normalized_table.append([normalize(cell) if cell else "" for cell in cleaned_row])
         
         if not cleaned_table:
             return results
             
         # 根据阅读顺序处理
         if self.read_order == "left_to_right":
-            results.extend(self._process_horizontal(cleaned_table))
+            results.extend(self._process_horizontal(cleaned_table, normalized_table))
         else:
-            results.extend(self._process_vertical(cleaned_table))
+            results.extend(self._process_vertical(cleaned_table, normalized_table))
             
         return results
 
-    def _process_horizontal(self, table: List[List]) -> List[Dict]:
-        """从左到右处理表格"""
+    def _process_horizontal(self, table: List[List], normalized: List[List]) -> List[Dict]:
+        """从左到右处理表格，normalized 为与 table 同形的标准化网格"""
         results = []
         found_keys = set()  # 跟踪已找到的键
         
         # 严格匹配自定义键
-        for row in table:
+        for row, normalized_row in zip(table, normalized):
             for i in range(len(row)):
                 current_cell = row[i]
                 if not current_cell:
                     continue
                 
-                current_normalized = self._normalize_text(current_cell)
+                current_normalized = normalized_row[i]
                 
-                # 严格匹配自定义键
+                # 严格匹配自定义键：完全相等才算匹配成功，避免"时间"匹配到"公示开始时间"等情况
                 matched_key = None
-                for idx, key_template in enumerate(self.custom_keys):
-                    # 完全相等才算匹配成功，避免"时间"匹配到"公示开始时间"等情况
-                    if current_normalized == key_template:
-                        matched_key = self.original_keys[idx]
-                        found_keys.add(key_template)
-                        break
+                idx = self.key_matcher.exact(current_normalized)
+                if idx is not None:
+                    matched_key = self.original_keys[idx]
+                    found_keys.add(self.custom_keys[idx])
                         
                 if matched_key:
                     # 提取值：扫描右侧所有单元格，完整保留所有内容
@@ -162,33 +362,21 @@ class PDFProcessor:
         
         # 第二步：宽松匹配未找到的键
         if len(found_keys) < len(self.custom_keys):
-            for row in table:
+            for row, normalized_row in zip(table, normalized):
                 for i in range(len(row)):
                     current_cell = row[i]
                     if not current_cell:
                         continue
                     
-                    current_normalized = self._normalize_text(current_cell)
+                    current_normalized = normalized_row[i]
                     
-                    # 对于时间相关的键名，需要更严格的匹配规则
-                    for idx, key_template in enumerate(self.custom_keys):
+                    # 候选键名已按顺序排列：时间相关键名只接受完全相等或以键名开头，
+                    # 非时间类键名允许互相包含
+                    for idx in self.key_matcher.loose(current_normalized):
+                        key_template = self.custom_keys[idx]
                         if key_template in found_keys:
                             continue  # 跳过已找到的键
                         
-                        # 时间相关键名需要特殊处理
-                        if '时间' in key_template:
-                            if current_normalized == '时间' and key_template != '时间':
-                                continue
-                            
-                            if not (key_template == current_normalized or 
-                                   current_normalized.startswith(key_template)):
-                                continue
-                        else:
-                            # 非时间类键名可以使用宽松匹配
-                            if not (key_template in current_normalized or 
-                                   current_normalized in key_template):
-                                continue
-                        
                         # 提取值：完整保留单元格内容
                         for j in range(i + 1, len(row)):
                             next_cell = row[j]
@@ -204,8 +392,8 @@ class PDFProcessor:
 
         return results
 
-    def _process_vertical(self, table: List[List]) -> List[Dict]:
-        """从上到下处理表格"""
+    def _process_vertical(self, table: List[List], normalized: List[List]) -> List[Dict]:
+        """从上到下处理表格，normalized 为与 table 同形的标准化网格"""
         results = []
         found_keys = set()  # 跟踪已找到的键
         
@@ -219,16 +407,14 @@ class PDFProcessor:
                 if not current_cell:
                     continue
                 
-                current_normalized = self._normalize_text(current_cell)
+                current_normalized = normalized[row][col]
                 
-                # 严格匹配自定义键
+                # 严格匹配自定义键：完全相等才算匹配成功
                 matched_key = None
-                for idx, key_template in enumerate(self.custom_keys):
-                    # 完全相等才算匹配成功
-                    if current_normalized == key_template:
-                        matched_key = self.original_keys[idx]
-                        found_keys.add(key_template)
-                        break
+                idx = self.key_matcher.exact(current_normalized)
+                if idx is not None:
+                    matched_key = self.original_keys[idx]
+                    found_keys.add(self.custom_keys[idx])
                         
                 if matched_key:
                     # 寻找值：扫描下方所有单元格直到找到非空值
@@ -250,26 +436,14 @@ class PDFProcessor:
                     if not current_cell:
                         continue
                     
-                    current_normalized = self._normalize_text(current_cell)
+                    current_normalized = normalized[row][col]
                     
-                    for idx, key_template in enumerate(self.custom_keys):
+                    # 候选键名已按顺序排列，时间相关键名使用更严格的匹配规则
+                    for idx in self.key_matcher.loose(current_normalized):
+                        key_template = self.custom_keys[idx]
                         if key_template in found_keys:
                             continue  # 跳过已找到的键
                         
-                        # 时间相关键名需要特殊处理
-                        if '时间' in key_template:
-                            if current_normalized == '时间' and key_template != '时间':
-                                continue
-                            
-                            if not (key_template == current_normalized or 
-                                   current_normalized.startswith(key_template)):
-                                continue
-                        else:
-                            # 非时间键名允许更宽松的匹配
-                            if not (key_template in current_normalized or 
-                                   current_normalized in key_template):
-                                continue
-                        
                         # 寻找值：完整保留单元格内容
                         for next_row in range(row + 1, rows):
                             next_cell = table[next_row][col]
@@ -306,160 +480,438 @@ class PDFProcessor:
 
     def _deduplicate_results(self, results: List[Dict]) -> List[Dict]:
         """优化的去重逻辑，合并相同值，避免错误匹配"""
-        final_results = []
-        seen_keys = {}
-        
-        # 额外处理时间相关键名的映射
-        time_related_keys = {}
-        for idx, key in enumerate(self.original_keys):
-            if '时间' in self._normalize_text(key):
-                key_base = self._normalize_text(key)
-                time_related_keys[key_base] = idx
-        
-        # 按照预定义键名的顺序处理
-        for idx, template_key in enumerate(self.custom_keys):
-            original_key = self.original_keys[idx]
-            template_base = template_key.split('(')[0].split('（')[0]
-            is_time_key = '时间' in template_key
-            is_price_key = any(x in original_key for x in ['控制价', '预算', '金额', '报价'])
-            
-            best_match = None
-            best_value = ""
-            
-            # 查找最佳匹配
-            for result in results:
-                key_normalized = self._normalize_text(result['key'])
-                
-                # 处理时间键名
-                if is_time_key:
-                    # 如果当前结果的键是"时间"而当前模板不是纯"时间"，则跳过
-                    if key_normalized == '时间' and template_key != '时间':
-                        continue
-                    
-                    # 对于时间键名，只有精确匹配或以模板开头才接受
-                    if not (template_key == key_normalized or
-                           key_normalized.startswith(template_key)):
-                        continue
-                else:
-                    # 非时间键名允许更宽松的匹配
-                    if not (template_base in key_normalized or key_normalized in template_base):
-                        continue
-                
-                # 优先选择有值的结果
-                current_value = result['value'].strip()
-                if not best_match or (current_value and not best_value):
-                    best_match = result
-                    best_value = current_value
-            
-            # 如果找到匹配且还未添加过
-            if best_match:
-                # 更新键名为预定义的键名，确保输出一致性
-                best_match['key'] = original_key
-                
-                # 处理时间值：如果是时间相关的键名，只保留日期部分
-                if is_time_key:
-                    best_match['value'] = self._extract_date(best_match['value'])
-                # 如果是价格类键名，进行特殊处理
-                elif is_price_key:
-                    best_match['value'] = self._extract_price(best_match['value'])
-                
-                # 检查是否已有相同键名
-                key_base = self._normalize_text(original_key)
-                if key_base not in seen_keys:
-                    seen_keys[key_base] = True
-                    final_results.append(best_match)
-        
-        return final_results
+        deduplicator = IncrementalDeduplicator(self)
+        deduplicator.feed(results)
+        return deduplicator.results()
 
     def process_pdf(self, file_path: str) -> List[Dict]:
-        """处理PDF文件"""
-        all_results = []
+        """处理PDF文件，内容和配置均未变化的文件直接返回缓存结果"""
+        self.stats.begin_document(file_path)
         try:
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    # 处理表格
-                    tables = page.extract_tables()
-                    for table in tables:
-                        results = self._process_table(table)
-                        if results:
-                            all_results.extend(results)
-                            
-                    # 启用文本块处理，补充表格提取无法识别的部分
-                    text_blocks = self._extract_text_blocks(page)
-                    if text_blocks:
-                        all_results.extend(self._process_text_blocks(text_blocks))
+            return self._process_pdf(file_path)
+        finally:
+            self.stats.end_document()
+
+    def _process_pdf(self, file_path: str) -> List[Dict]:
+        cache_key = None
+        if self._cache:
+            try:
+                cache_key = ResultCache.file_digest(file_path) + ':' + self._cache_fingerprint()
+            except OSError:
+                cache_key = None  # 文件无法读取，交由下面的提取流程报告错误
+            if cache_key and self.cache_mode == 'use':
+                cached = self._cache.get(cache_key)
+                if cached is not None:
+                    self.stats.count('cache_hits')
+                    self.stats.count('results', len(cached))
+                    return cached
+
+        degraded_count = len(self.degraded_files)
+        layout = None
+        if self._layouts:
+            layout = LayoutSession(self._layouts, self.key_matcher, self._cache_fingerprint())
+        deduplicator = self._collect(file_path, layout)
+        if layout is not None:
+            if layout.template is not None and not layout.verify(deduplicator.satisfied()):
+                # 套用模板未取得全部键名，回退为完整提取并重新记录模板
+                layout.reset()
+                deduplicator = self._collect(file_path, layout)
+            if len(self.degraded_files) == degraded_count:
+                layout.save(deduplicator.satisfied())
+
+        with self.stats.stage('dedup'):
+            results = deduplicator.results()
+        self.stats.count('results', len(results))
+        # 降级处理得到的结果不完整，不写入缓存
+        if cache_key and len(self.degraded_files) == degraded_count:
+            self._cache.put(cache_key, results)
+        return results
+
+    def _collect(self, file_path: str, layout: Optional[LayoutSession] = None) -> 'IncrementalDeduplicator':
+        """逐页提取并汇总到增量去重器"""
+        deduplicator = IncrementalDeduplicator(self)
+        pages = self.iter_pdf(file_path, layout)
+        try:
+            for _, page_results in pages:
+                if self._should_cancel and self._should_cancel():
+                    raise ProcessingCancelled("处理已取消")
+                deduplicator.feed(page_results)
+                # 所有键名都已取得非空值时不再解析后续页面
+                if self.stop_when_complete and deduplicator.is_complete():
+                    break
+        finally:
+            pages.close()
+        return deduplicator
+
+    def iter_pdf(self, file_path: str, layout: Optional[LayoutSession] = None) -> Iterator[Tuple[int, List[Dict]]]:
+        """逐页解析PDF，依次产出 (页码, 该页的原始提取结果)
+
+        结果尚未去重，可交给 IncrementalDeduplicator 汇总；调用方可随时停止迭代。
+        被预筛选或版面模板跳过的页面产出空列表。
+        layout 为版面模板会话：命中模板时只解析模板记录的页面和表格区域，未命中时记录本次的区域。
+        """
+        memory_exceeded = False  # 超出内存上限后降级为只处理文本块
+        stats = self.stats
+        try:
+            pages = self.backend.iter_pages(file_path)
+            try:
+                # 打开文档和创建页面对象的用时计入 'open' 阶段
+                for page_index, context in enumerate(stats.iterate('open', pages)):
+                    if self.max_pages and page_index >= self.max_pages:
+                        break
+                    
+                    if layout is not None and layout.template is not None and page_index > 0:
+                        # 模板中最后一个产生结果的页面之后不再解析
+                        if context.page_number > layout.last_page:
+                            context.close()
+                            break
+                    
+                    try:
+                        stats.count('pages')
+                        page_results = []
+                        if layout is not None:
+                            if page_index == 0:
+                                layout.begin(context)
+                            # 模板中未产生结果的页面不解析内容
+                            if layout.template is not None and not layout.covers(context.page_number):
+                                stats.count('skipped_pages')
+                                yield context.page_number, page_results
+                                continue
+                        
+                        with stats.stage('parse'):
+                            # 页面内容在首次访问字符时才解析，此处访问使解析用时单独计入
+                            stats.count('chars', len(context.chars))
+                            has_key = not self.page_prefilter or self._page_has_key(context)
+                        if not has_key:
+                            stats.count('skipped_pages')
+                            yield context.page_number, page_results
+                            continue
+                        
+                        # 处理表格
+                        table_regions = []  # 产生结果的表格区域，供版面模板记录
+                        if not memory_exceeded:
+                            table_context = context
+                            if layout is not None and layout.template is not None:
+                                # 只在模板记录的表格区域内识别表格
+                                region = layout.table_region(context.page_number)
+                                table_context = context.crop(region) if region else None
+                            if table_context is not None:
+                                with stats.stage('tables'):
+                                    tables = table_context.extract_tables()
+                                stats.count_tables(tables)
+                                with stats.stage('matching'):
+                                    for table, bbox in zip(tables, table_context.table_bboxes):
+                                        results = self._process_table(table)
+                                        if results:
+                                            page_results.extend(results)
+                                            table_regions.append(bbox)
+                                if table_context is not context:
+                                    table_context.close()
+                                
+                        # 启用文本块处理，补充表格提取无法识别的部分
+                        with stats.stage('text_blocks'):
+                            text_blocks = self._extract_text_blocks(context)
+                        stats.count('words', len(context.words()))
+                        stats.count('blocks', len(text_blocks))
+                        if text_blocks:
+                            with stats.stage('matching'):
+                                page_results.extend(self._process_text_blocks(text_blocks))
+                        stats.count('raw_results', len(page_results))
+                        
+                        if layout is not None:
+                            layout.record(context.page_number, page_results, table_regions)
+                        yield context.page_number, page_results
+                    finally:
+                        # 处理完立即释放该页的版面缓存，内存占用不随页数增长
+                        context.close()
+                    
+                    if self.memory_limit_mb and not memory_exceeded:
+                        memory_exceeded = self._check_memory(file_path)
+                        if memory_exceeded:
+                            self.degraded_files.append(file_path)
+                            stats.count('degraded')
+            finally:
+                # 提前结束迭代时关闭文档
+                pages.close()
                             
+        except FileProcessingError:
+            # 内存超限放弃处理，保留失败原因
+            raise
         except Exception as e:
             raise Exception(f"PDF处理错误: {str(e)}")
-            
-        return self._deduplicate_results(all_results)
 
-    def _extract_text_blocks(self, page) -> List[Dict]:
+    def _check_memory(self, file_path: str) -> bool:
+        """检查进程内存是否超出上限：按策略放弃文档或返回True表示降级处理"""
+        rss_mb = process_rss_mb()
+        if rss_mb is None or rss_mb <= self.memory_limit_mb:
+            return False
+        gc.collect()
+        rss_mb = process_rss_mb()
+        if rss_mb is None or rss_mb <= self.memory_limit_mb:
+            return False
+        if self.memory_policy == 'abandon':
+            raise FileProcessingError(
+                file_path, 'memory',
+                f"{os.path.basename(file_path)} 内存占用 {rss_mb:.0f}MB 超过上限 {self.memory_limit_mb}MB，已放弃处理")
+        return True
+
+    def _page_has_key(self, context: PageContext) -> bool:
+        """预筛选：页面字符去除空白后是否包含任一完整键名
+
+        只包含键名一部分的表格标签不会通过预筛选，启用时这类表格中的值不会被提取。
+        """
+        page_text = context.text()
+        page_text = _WHITESPACE_PATTERN.sub('', page_text)
+        page_text = page_text.replace('（', '(').replace('）', ')').lower()
+        return self.key_matcher.contains_key(page_text)
+
+    def process_many(self, file_paths: List[str], workers: Optional[int] = None,
+                     progress_callback: Optional[Callable] = None, timeout: Optional[float] = None,
+                     memory_limit_mb: Optional[float] = None,
+                     should_cancel: Optional[Callable[[], bool]] = None) -> List[Union[List[Dict], Exception]]:
+        """使用进程池批量处理PDF文件
+
+        返回结果与 file_paths 顺序一一对应；处理失败的文件对应位置为异常对象，
+        失败文件及原因同时记录在 self.failures 中，因内存超限降级处理的文件记录在 self.degraded_files 中。
+        progress_callback(file_path, result) 在每个文件完成时于调用方进程中被调用。
+        指定 timeout（秒）或 memory_limit_mb 时，每个文件在受监管的工作进程中处理，
+        超时或内存超限的进程会被终止并重启。
+        启用分阶段统计时，self.stats 汇总本次处理的全部文档。
+        should_cancel() 返回True时在文件之间（单进程时在页与页之间）停止处理并抛出 ProcessingCancelled，
+        可由其他线程触发。
+        """
+        file_paths = list(file_paths)
+        results = [None] * len(file_paths)
+        self.failures = []
+        self.degraded_files = []
+        self.stats.reset()
+        if not file_paths:
+            return results
+
+        def absorb(file_path, result):
+            """并入工作进程返回的文档统计，并记下其中降级处理的文件"""
+            result = self.stats.absorb(file_path, result)
+            document = self.stats.documents.get(file_path) if self.stats.enabled else None
+            if document and document['counts']['degraded'] and file_path not in self.degraded_files:
+                self.degraded_files.append(file_path)
+            return result
+
+        if workers is None or workers <= 0:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(file_paths))
+
+        def file_size(idx):
+            try:
+                return os.path.getsize(file_paths[idx])
+            except OSError:
+                return 0
+
+        # 大文件优先调度，避免最后只剩一个大文件拖慢整个批次
+        schedule = sorted(range(len(file_paths)), key=file_size, reverse=True)
+
+        if (timeout and timeout > 0) or (memory_limit_mb and memory_limit_mb > 0):
+            def on_result(file_path, result):
+                result = absorb(file_path, result)
+                if progress_callback:
+                    progress_callback(file_path, result)
+
+            runner = IsolatedRunner(_init_worker, (self._get_config(),), _process_in_worker,
+                                    workers=workers, timeout=timeout, memory_limit_mb=memory_limit_mb)
+            results = runner.run(file_paths, schedule, on_result, should_cancel)
+            self.failures = runner.failures
+            if runner.cancelled:
+                raise ProcessingCancelled("处理已取消")
+            return [absorb(file_path, result) for file_path, result in zip(file_paths, results)]
+
+        def finish(idx, result):
+            result = absorb(file_paths[idx], result)
+            if isinstance(result, Exception):
+                self.failures.append({
+                    'file': file_paths[idx],
+                    'reason': getattr(result, 'reason', 'error'),
+                    'message': str(result)
+                })
+            results[idx] = result
+            if progress_callback:
+                progress_callback(file_paths[idx], result)
+
+        # 单进程时直接在当前进程处理，避免进程池的启动开销
+        if workers <= 1:
+            self._should_cancel = should_cancel
+            try:
+                for idx, file_path in enumerate(file_paths):
+                    if should_cancel and should_cancel():
+                        raise ProcessingCancelled("处理已取消")
+                    try:
+                        result = self.process_pdf(file_path)
+                    except ProcessingCancelled:
+                        raise
+                    except Exception as e:
+                        result = e
+                    finish(idx, result)
+            finally:
+                self._should_cancel = None
+            return results
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self._get_config(),)) as executor:
+            futures = {executor.submit(_process_in_worker, file_paths[idx]): idx for idx in schedule}
+            remaining = set(futures)
+            while remaining:
+                # 定时返回以便及时响应取消
+                done, remaining = wait(remaining, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # 工作进程异常退出等情况
+                        result = FileProcessingError(file_paths[idx], 'crash', f"PDF处理错误: {str(e)}")
+                    finish(idx, result)
+                if remaining and should_cancel and should_cancel():
+                    # 取消尚未开始的文件，正在处理的文件完成后退出
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    raise ProcessingCancelled("处理已取消")
+
+        return results
+
+    def _extract_text_blocks(self, context: PageContext) -> List[Dict]:
         try:
-            # 大幅增大x容差值，以便能够正确处理单元格内的大空格分隔
-            words = page.extract_words(keep_blank_chars=True, x_tolerance=15, y_tolerance=5)
+            words = list(context.words())
             
             if not words:
                 return []
                 
             # 确保所有必需的键都存在
             words = [w for w in words if all(k in w for k in ['x0', 'top', 'text'])]
+            if not words:
+                return []
             
+            texts = [w['text'] for w in words]
+            x0 = np.array([w['x0'] for w in words], dtype=float)
+            top = np.array([w['top'] for w in words], dtype=float)
+            # 缺少结束位置时按字符数估算
+            x1 = np.array([w.get('x1', w['x0'] + len(w['text']) * 5) for w in words], dtype=float)
+            
+            # 稳定排序，与按 (top, x0) 或 (x0, top) 排序的结果一致
             if self.read_order == "top_to_bottom":
-                words.sort(key=lambda x: (x['top'], x['x0']))
+                order = np.lexsort((x0, top))
             else:
-                words.sort(key=lambda x: (x['x0'], x['top']))
-                
-            blocks = []
-            current_block = ""
-            current_position = None
-            current_top = None
-            last_x1 = None  # 跟踪上一个单词的结束位置
+                order = np.lexsort((top, x0))
+            words = [words[idx] for idx in order]
+            texts = [texts[idx] for idx in order]
+            x0, top, x1 = x0[order], top[order], x1[order]
             
-            for word in words:
-                if not current_position:
-                    current_position = (word['x0'], word['top'])
-                    current_top = word['top']
-                    current_block = word['text']
-                    last_x1 = word.get('x1', word['x0'] + len(word['text']) * 5)  # 估算结束位置
-                elif abs(word['top'] - current_top) < 8:  # 同一行
-                    space_needed = True
-                    
-                    # 判断是否需要添加空格 - 基于实际间距
-                    if last_x1 and 'x0' in word:
-                        # 如果间距大于阈值，添加空格，保留原始格式
-                        x_gap = word['x0'] - last_x1
-                        space_needed = x_gap > 10  # 根据实际PDF格式调整
-                        
-                    # 添加适当的连接符
-                    if space_needed and current_block and not current_block.endswith(' ') and not word['text'].startswith(' '):
-                        current_block += " " + word['text']
-                    else:
-                        current_block += word['text']
-                        
-                    last_x1 = word.get('x1', word['x0'] + len(word['text']) * 5)
-                else:
-                    if current_block.strip():
-                        blocks.append({
-                            'text': current_block.strip(),
-                            'position': current_position
-                        })
-                    current_block = word['text']
-                    current_position = (word['x0'], word['top'])
-                    current_top = word['top']
-                    last_x1 = word.get('x1', word['x0'] + len(word['text']) * 5)
+            # 含空文本的词会影响是否补空格的判断，此时逐词处理
+            if not all(texts):
+                return self._group_words_sequential(words)
             
-            if current_block and current_block.strip():
-                blocks.append({
-                    'text': current_block.strip(),
-                    'position': current_position
-                })
+            # 行的划分：与行首单词的top相差8以内视为同一行
+            starts = self._line_starts(top)
+            line_start = np.zeros(len(words), dtype=bool)
+            line_start[starts] = True
+            
+            # 同一行内与上一个单词的间距大于阈值时补一个空格，保留原始格式；
+            # 上一个单词已以空格结尾或当前单词以空格开头时不再补
+            prev_x1 = np.concatenate(([0.0], x1[:-1]))
+            space_needed = (prev_x1 == 0) | ((x0 - prev_x1) > 10)
+            ends_space = np.array([text.endswith(' ') for text in texts], dtype=bool)
+            starts_space = np.array([text.startswith(' ') for text in texts], dtype=bool)
+            prev_ends_space = np.concatenate(([False], ends_space[:-1]))
+            add_space = (~line_start & space_needed & ~prev_ends_space & ~starts_space).tolist()
+            pieces = [" " + text if space else text for text, space in zip(texts, add_space)]
+            
+            blocks = []
+            bounds = starts.tolist() + [len(words)]
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                block_text = "".join(pieces[start:end]).strip()
+                if block_text:
+                    blocks.append({
+                        'text': block_text,
+                        'position': (words[start]['x0'], words[start]['top'])
+                    })
                 
             return blocks
             
         except Exception as e:
             raise Exception(f"文本块提取错误: {str(e)}")
 
+    @staticmethod
+    def _line_starts(top: np.ndarray) -> np.ndarray:
+        """每一行第一个单词的下标
+
+        行首单词决定整行的基准top，因此逐行向后查找第一个超出容差的单词；
+        查找窗口按倍数扩大，总比较次数与单词数成正比。
+        """
+        starts = [0]
+        anchor = 0
+        count = len(top)
+        while True:
+            position = anchor + 1
+            window = 64
+            found = None
+            while position < count:
+                segment = top[position:position + window]
+                hits = np.flatnonzero(~(np.abs(segment - top[anchor]) < 8))
+                if hits.size:
+                    found = position + int(hits[0])
+                    break
+                position += window
+                window *= 2
+            if found is None:
+                return np.array(starts, dtype=int)
+            starts.append(found)
+            anchor = found
+
+    def _group_words_sequential(self, words: List[Dict]) -> List[Dict]:
+        """逐词将已排序的单词合并为文本块"""
+        blocks = []
+        current_block = ""
+        current_position = None
+        current_top = None
+        last_x1 = None  # 跟踪上一个单词的结束位置
+        
+        for word in words:
+            if not current_position:
+                current_position = (word['x0'], word['top'])
+                current_top = word['top']
+                current_block = word['text']
+                last_x1 = word.get('x1', word['x0'] + len(word['text']) * 5)  # 估算结束位置
+            elif abs(word['top'] - current_top) < 8:  # 同一行
+                space_needed = True
+                
+                # 判断是否需要添加空格 - 基于实际间距
+                if last_x1 and 'x0' in word:
+                    # 如果间距大于阈值，添加空格，保留原始格式
+                    x_gap = word['x0'] - last_x1
+                    space_needed = x_gap > 10  # 根据实际PDF格式调整
+                    
+                # 添加适当的连接符
+                if space_needed and current_block and not current_block.endswith(' ') and not word['text'].startswith(' '):
+                    current_block += " " + word['text']
+                else:
+                    current_block += word['text']
+                    
+                last_x1 = word.get('x1', word['x0'] + len(word['text']) * 5)
+            else:
+                if current_block.strip():
+                    blocks.append({
+                        'text': current_block.strip(),
+                        'position': current_position
+                    })
+                current_block = word['text']
+                current_position = (word['x0'], word['top'])
+                current_top = word['top']
+                last_x1 = word.get('x1', word['x0'] + len(word['text']) * 5)
+        
+        if current_block and current_block.strip():
+            blocks.append({
+                'text': current_block.strip(),
+                'position': current_position
+            })
+            
+        return blocks
+
     def _is_key(self, text: str) -> bool:
         """改进的键名匹配逻辑"""
         if not text or not self.custom_keys:
@@ -468,22 +920,8 @@ class PDFProcessor:
         # 标准化文本，但保留括号等特殊字符
         test_text = self._normalize_text(text)
         
-        for key in self.custom_keys:
-            # 处理可能的变体
-            variants = [
-                key,  # 原始键名
-                key + ":",  # 英文冒号
-                key + "：",  # 中文冒号
-                key + "(元)",  # 带单位
-                key + "（元）",  # 带单位（中文括号）
-                key.replace("（元）", "").replace("(元)", "")  # 去掉单位的版本
-            ]
-            
-            # 任何一个变体匹配就返回True
-            if any(variant in test_text for variant in variants):
-                return True
-                
-        return False
+        # 带冒号、带单位的变体都包含键名本身，只需判断文本中是否出现任一键名
+        return self.key_matcher.contains_key(test_text)
 
     def _process_text_blocks(self, blocks: List[Dict]) -> List[Dict]:
         results = []
@@ -530,3 +968,77 @@ class PDFProcessor:
                 })
         
         return results
+
+
+class IncrementalDeduplicator:
+    """增量去重器：逐页输入原始结果，随时可按模板顺序取得去重后的结果
+
+    索引随输入持续更新，只保留可能被选中的结果，占用的内存与键名数量有关而与文档长度无关。
+    """
+
+    def __init__(self, processor: PDFProcessor):
+        self.processor = processor
+        self._index = _ResultIndex(processor.key_matcher)
+        self._limit = len(processor.custom_keys)
+        self._satisfied = set()  # 已取得非空值的模板下标
+
+    def feed(self, results: List[Dict]):
+        """输入一批原始结果（通常为一页）"""
+        key_matcher = self.processor.key_matcher
+        for result in results:
+            if result['value'].strip():
+                self._satisfied.update(key_matcher.result_matches(_normalize_key(result['key'])))
+            self._index.add(result, self._limit)
+
+    def satisfied(self) -> frozenset:
+        """已取得非空值的模板下标"""
+        return frozenset(self._satisfied)
+
+    def is_complete(self) -> bool:
+        """所有键名是否都已取得非空值"""
+        return len(self._satisfied) >= len(self.processor.custom_keys)
+
+    def results(self) -> List[Dict]:
+        """按预定义键名的顺序选出每个键名的最佳结果
+
+        在索引的副本上计算，可在输入过程中多次调用。
+        """
+        processor = self.processor
+        index = self._index.copy()
+        results = index.results
+        
+        final_results = []
+        seen_keys = set()
+        
+        # 按照预定义键名的顺序处理
+        for idx, template_key in enumerate(processor.custom_keys):
+            original_key = processor.original_keys[idx]
+            is_time_key = '时间' in template_key
+            is_price_key = any(x in original_key for x in ['控制价', '预算', '金额', '报价'])
+            
+            # 查找最佳匹配：时间键名只接受精确匹配或以模板开头，非时间键名允许更宽松的匹配；
+            # 优先选择有值的结果
+            position = index.best(idx)
+            
+            # 如果找到匹配且还未添加过
+            if position is not None:
+                best_match = results[position]
+                # 更新键名为预定义的键名，确保输出一致性
+                best_match['key'] = original_key
+                
+                # 处理时间值：如果是时间相关的键名，只保留日期部分
+                if is_time_key:
+                    best_match['value'] = processor._extract_date(best_match['value'])
+                # 如果是价格类键名，进行特殊处理
+                elif is_price_key:
+                    best_match['value'] = processor._extract_price(best_match['value'])
+                # 键名和值已被改写，后续模板需按新的键名匹配该结果
+                index.refresh(position)
+                
+                # 检查是否已有相同键名
+                key_base = _normalize_key(original_key)
+                if key_base not in seen_keys:
+                    seen_keys.add(key_base)
+                    final_results.append(best_match)
+        
+        return final_results
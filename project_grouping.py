@@ -0,0 +1,144 @@
+import os
+import re
+from typing import List, Dict, Optional, Tuple, Union
+
+
+def group_by_folder(files: List[str]) -> Dict[str, List[str]]:
+    """按所在文件夹组织文件，保持文件的原始顺序"""
+    folder_files = {}
+    for file in files:
+        folder = os.path.dirname(file)
+        if folder not in folder_files:
+            folder_files[folder] = []
+        folder_files[folder].append(file)
+    return folder_files
+
+
+def merge_values(target: Dict[str, Dict], items):
+    """将结果合并到 键名 -> 结果 的映射中，优先使用新的非空值"""
+    for item in items:
+        if item['key'] not in target or (
+            item['value'].strip() and not target[item['key']]['value'].strip()):
+            target[item['key']] = item
+
+
+def has_project_name(values: Dict[str, Dict]) -> bool:
+    """检查采购项目名称是否为空"""
+    for key, item in values.items():
+        if '采购项目名称' in key and item['value'].strip():
+            return True
+    return False
+
+
+def export_records(files: List[str], file_results: Dict[str, Union[List[Dict], Exception]],
+                   project_mode: str) -> List[Dict]:
+    """导出用的逐条结果，每条附带文件名和文件夹名
+
+    project_mode 为 "same" 时，每个文件夹只保留每个键的第一个值。
+    """
+    records = []
+    for folder, folder_files in group_by_folder(files).items():
+        folder_results = []
+        for file in folder_files:
+            result = file_results.get(file)
+            if result and not isinstance(result, Exception):
+                for item in result:
+                    item['filename'] = os.path.basename(file)
+                    item['folder'] = os.path.basename(folder)
+                folder_results.extend(result)
+
+        # 根据项目处理模式决定是否合并结果
+        if project_mode == "same" and folder_results:
+            # 只保留每个键的第一个值
+            unique_results = {}
+            for item in folder_results:
+                if item['key'] not in unique_results:
+                    unique_results[item['key']] = item
+            folder_results = list(unique_results.values())
+
+        records.extend(folder_results)
+    return records
+
+
+def project_values(files: List[str], file_results: Dict[str, Union[List[Dict], Exception]],
+                   project_mode: str) -> Tuple[List[Dict], List[str]]:
+    """按项目汇总键值，用于生成每个项目一行的记录
+
+    返回 (项目列表, 被跳过的文件夹名)。每个项目为 {'folders': 文件夹列表, 'values': 键名 -> 结果}；
+    采购项目名称为空的文件夹被跳过。project_mode 为 "same" 时所有文件夹合并为一个项目。
+    """
+    projects = []
+    skipped_folders = []
+    combined_values = {}
+    combined_folders = []
+
+    for folder, folder_files in group_by_folder(files).items():
+        folder_values = {}
+        for file in folder_files:
+            results = file_results.get(file)
+            if results and not isinstance(results, Exception):
+                merge_values(folder_values, results)
+
+        if not has_project_name(folder_values):
+            skipped_folders.append(os.path.basename(folder))
+            continue
+
+        if project_mode == "same":
+            # 合并到总结果中
+            merge_values(combined_values, folder_values.values())
+            combined_folders.append(folder)
+        else:
+            # 每个文件夹作为独立项目
+            projects.append({'folders': [folder], 'values': folder_values})
+
+    # 合并模式下同样要求采购项目名称不为空
+    if project_mode == "same" and combined_values and has_project_name(combined_values):
+        projects.append({'folders': combined_folders, 'values': combined_values})
+
+    return projects, skipped_folders
+
+
+def normalize_column_name(text: str) -> str:
+    """标准化文本，移除所有空白字符但保留基本文本"""
+    if not text:
+        return ""
+    # 移除所有空白字符
+    text = re.sub(r'\s+', '', text)
+    # 移除中英文冒号和括号
+    text = text.rstrip('：:')
+    # 统一括号格式
+    text = text.replace('（', '(').replace('）', ')')
+    # 移除可能的括号内容
+    text = re.sub(r'\([^)]*\)', '', text)
+    # 转换为小写
+    return text.lower()
+
+
+def find_matching_column(key: str, columns: List) -> Optional[str]:
+    """查找与键名严格匹配的列名"""
+    if key is None:
+        return None
+
+    # 确保key是字符串类型
+    key = normalize_column_name(str(key))
+
+    # 首先尝试完全匹配
+    for col in columns:
+        col_str = str(col) if col is not None else ""
+        if normalize_column_name(col_str) == key:
+            return col
+
+    return None
+
+
+def project_rows(projects: List[Dict], columns: List) -> List[Dict]:
+    """将 project_values 得到的项目转换为现有Excel的行，键名按列名严格匹配，未匹配的列为空"""
+    rows = []
+    for project in projects:
+        row_data = {col: '' for col in columns}
+        for item in project['values'].values():
+            matching_col = find_matching_column(item['key'], columns)
+            if matching_col:
+                row_data[matching_col] = item['value']
+        rows.append(row_data)
+    return rows
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import List, Dict, Optional
+
+# 提取逻辑发生变化时递增，使旧缓存自动失效
+CACHE_VERSION = 1
+
+
+class ResultCache:
+    """基于SQLite的提取结果缓存，键为文件内容哈希加键名配置指纹"""
+
+    def __init__(self, db_path: str, max_size_mb: float = 512):
+        self.db_path = db_path
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            db_dir = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(db_dir, exist_ok=True)
+            # 多个工作进程可能同时写入，设置等待超时并使用WAL模式
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "cache_key TEXT PRIMARY KEY, "
+                "payload TEXT NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON results(last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def file_digest(file_path: str) -> str:
+        """计算文件内容的SHA-256哈希"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_fingerprint(options: Dict) -> str:
+        """根据标准化键名列表和处理选项生成指纹"""
+        options = dict(options, cache_version=CACHE_VERSION)
+        encoded = json.dumps(options, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def get(self, cache_key: str) -> Optional[List[Dict]]:
+        """读取缓存结果，未命中返回None"""
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT payload FROM results WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE results SET last_access = ? WHERE cache_key = ?",
+                (time.time(), cache_key)
+            )
+            conn.commit()
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            print(f"读取缓存出错: {str(e)}")
+            return None
+
+    def put(self, cache_key: str, results: List[Dict]):
+        """写入缓存结果，并在超出容量时淘汰最久未使用的条目"""
+        payload = json.dumps(results, ensure_ascii=False)
+        size = len(payload.encode('utf-8'))
+        if size > self.max_size_bytes:
+            return
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (cache_key, payload, size, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (cache_key, payload, size, time.time())
+            )
+            self._evict(conn)
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"写入缓存出错: {str(e)}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        """按最近访问时间淘汰条目，直到总大小不超过上限"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+        cursor = conn.execute("SELECT cache_key, size FROM results ORDER BY last_access")
+        expired = []
+        for cache_key, size in cursor:
+            if total <= self.max_size_bytes:
+                break
+            expired.append((cache_key,))
+            total -= size
+        conn.executemany("DELETE FROM results WHERE cache_key = ?", expired)
+
+    def clear(self):
+        """清空所有缓存条目"""
+        try:
+            conn = self._connect()
+            conn.execute("DELETE FROM results")
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"清空缓存出错: {str(e)}")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from value_postprocess import parse_date, parse_dates, postprocess_columns, postprocess_record
+
+# 日期范围或带有其他文字的时间不能只保留其中一个日期
+UNCHANGED = [
+    '2025年3月1日9时至2025年3月5日17时',
+    '2025年3月1日起5个工作日',
+    '自2025年3月1日至2025年3月5日止',
+    '详见招标文件',
+]
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2025年3月1日', datetime(2025, 3, 1)),
+    ('2025-03-01', datetime(2025, 3, 1)),
+    (' 2025/3/1 ', datetime(2025, 3, 1)),
+    ('2025年2月30日', None),
+] + [(value, None) for value in UNCHANGED])
+def test_parse_date(value, expected):
+    assert parse_date(value) == expected
+
+
+def test_parse_dates_matches_parse_date():
+    values = pd.Series(['2025年3月1日', None, ''] + UNCHANGED)
+    parsed = parse_dates(values)
+    for value, typed in zip(values, parsed):
+        expected = parse_date(value)
+        assert (pd.isna(typed) and expected is None) or typed == expected
+
+
+@pytest.mark.parametrize('value', UNCHANGED)
+def test_postprocess_record_keeps_text(value):
+    record = {'key': '开标时间', 'value': value}
+    assert postprocess_record(record) == record
+
+
+def test_postprocess_columns_keeps_text():
+    df = postprocess_columns(pd.DataFrame({'开标时间': ['2025年3月1日'] + UNCHANGED}))
+    assert df['开标时间'].tolist() == [datetime(2025, 3, 1)] + UNCHANGED
@@ -0,0 +1,134 @@
+import re
+from datetime import datetime
+from typing import List, Dict, Optional
+
+import pandas as pd
+
+# 价格类键名关键字，与 PDFProcessor._normalize_value 一致
+PRICE_KEYWORDS = ['控制价', '预算', '金额', '报价', '上限价']
+
+# 预编译的批量处理规则
+_PRICE_KEY_PATTERN = re.compile('|'.join(map(re.escape, PRICE_KEYWORDS)))
+_TIME_KEY_PATTERN = re.compile('时间')
+_PRICE_TAIL_PATTERN = re.compile(r'([\d\s,.]+)$')  # 尾部的数字、空格、逗号和小数点
+_PRICE_ANY_PATTERN = re.compile(r'[\d,.]+')
+_FIRST_DECIMAL_PATTERN = re.compile(r'^([^.]*(?:\.[^.]*)?)')  # 只保留第一个小数点
+_PRICE_NOISE_PATTERN = re.compile(r'[\s,]')
+# 整个值只是一个日期时才转换，日期范围、带时刻或其他文字的值保留原文本
+_DATE_PATTERN = re.compile(r'^\s*(\d{4})[-/年](\d{1,2})[-/月](\d{1,2})日?\s*$')
+
+
+def is_price_key(key) -> bool:
+    return bool(_PRICE_KEY_PATTERN.search(str(key)))
+
+
+def is_time_key(key) -> bool:
+    return bool(_TIME_KEY_PATTERN.search(str(key)))
+
+
+def parse_prices(values: pd.Series) -> pd.Series:
+    """批量提取价格，规则与 PDFProcessor._extract_price 相同，返回float列，无法解析为NaN"""
+    text = values.fillna('').astype(str)
+    # 优先取尾部的数字部分，处理形如"采购上限价 533 333.33"的情况
+    number = text.str.extract(_PRICE_TAIL_PATTERN, expand=False)
+    # 尾部没有数字时合并文本中所有的数字序列
+    fallback = text.str.findall(_PRICE_ANY_PATTERN).str.join('')
+    number = number.fillna(fallback)
+    number = number.str.extract(_FIRST_DECIMAL_PATTERN, expand=False)
+    number = number.str.replace(_PRICE_NOISE_PATTERN, '', regex=True)
+    return pd.to_numeric(number, errors='coerce').astype('float64')
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """批量提取日期（年月日），返回datetime64列，值不是单个日期时为NaT"""
+    text = values.fillna('').astype(str)
+    parts = text.str.extract(_DATE_PATTERN).apply(pd.to_numeric, errors='coerce')
+    parts.columns = ['year', 'month', 'day']
+    return pd.to_datetime(parts, errors='coerce')
+
+
+def _text(value) -> str:
+    """与批量处理中的 fillna('').astype(str) 相同：缺失值视为空文本"""
+    if value is None or (isinstance(value, float) and value != value):
+        return ''
+    return str(value)
+
+
+def parse_price(value) -> Optional[float]:
+    """逐个值提取价格，与 parse_prices 的规则相同，无法解析时返回None"""
+    text = _text(value)
+    match = _PRICE_TAIL_PATTERN.search(text)
+    number = match.group(1) if match else ''.join(_PRICE_ANY_PATTERN.findall(text))
+    number = _FIRST_DECIMAL_PATTERN.match(number).group(1)
+    number = _PRICE_NOISE_PATTERN.sub('', number)
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def parse_date(value) -> Optional[datetime]:
+    """逐个值提取日期，与 parse_dates 的规则相同，值不是单个日期时返回None"""
+    match = _DATE_PATTERN.match(_text(value))
+    if not match:
+        return None
+    try:
+        return datetime(*map(int, match.groups()))
+    except ValueError:
+        return None
+
+
+def _merge_typed(typed: pd.Series, original: pd.Series) -> pd.Series:
+    """全部非空值都能解析时返回类型化列，否则无法解析的位置保留原文本"""
+    blank = original.isna() | (original.astype(str).str.strip() == '')
+    if typed[~blank].notna().all():
+        return typed
+    return typed.astype(object).where(typed.notna(), original)
+
+
+def postprocess_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """按列名对宽表批量处理：价格列转为数值，时间列转为日期"""
+    df = df.copy()
+    for column in df.columns:
+        if is_price_key(column):
+            df[column] = _merge_typed(parse_prices(df[column]), df[column])
+        elif is_time_key(column):
+            df[column] = _merge_typed(parse_dates(df[column]), df[column])
+    return df
+
+
+def postprocess_records(records: List[Dict]) -> pd.DataFrame:
+    """对 key/value 形式的提取结果批量处理，value 列中价格为数值、时间为日期，其余保持文本"""
+    df = pd.DataFrame(records)
+    if df.empty or 'key' not in df.columns or 'value' not in df.columns:
+        return df
+
+    keys = df['key'].astype(str)
+    price_mask = keys.str.contains(_PRICE_KEY_PATTERN)
+    time_mask = ~price_mask & keys.str.contains(_TIME_KEY_PATTERN)
+
+    values = df['value'].astype(object)
+    if price_mask.any():
+        prices = parse_prices(df.loc[price_mask, 'value'])
+        values[price_mask] = prices.astype(object).where(prices.notna(), df.loc[price_mask, 'value'])
+    if time_mask.any():
+        dates = parse_dates(df.loc[time_mask, 'value'])
+        values[time_mask] = dates.astype(object).where(dates.notna(), df.loc[time_mask, 'value'])
+    df['value'] = values
+    return df
+
+
+def postprocess_record(record: Dict) -> Dict:
+    """逐条处理 key/value 形式的提取结果，结果与 postprocess_records 相同，用于流式导出"""
+    if 'key' not in record or 'value' not in record:
+        return record
+    key = str(record['key'])
+    if _PRICE_KEY_PATTERN.search(key):
+        typed = parse_price(record['value'])
+    elif _TIME_KEY_PATTERN.search(key):
+        typed = parse_date(record['value'])
+    else:
+        return record
+    if typed is None:
+        return record
+    return dict(record, value=typed)